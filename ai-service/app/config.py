@@ -5,9 +5,15 @@ Uses Pydantic Settings for environment variable management
 with validation and type casting.
 """
 
-from typing import Optional
-from pydantic_settings import BaseSettings
-from pydantic import Field
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, FrozenSet, Optional
+from dotenv import dotenv_values
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import Field, PrivateAttr, TypeAdapter
 
 
 class Settings(BaseSettings):
@@ -28,14 +34,57 @@ class Settings(BaseSettings):
     DEFAULT_LLM_PROVIDER: str = Field(default="openai")
     DEFAULT_LLM_MODEL: str = Field(default="gpt-4-turbo-preview")
     FALLBACK_LLM_MODEL: str = Field(default="gpt-3.5-turbo")
+    # Strict JSON schema plan outputs (needs a model with structured outputs, e.g. gpt-4o)
+    STRUCTURED_OUTPUTS_ENABLED: bool = Field(default=False)
     
     # Food Recognition
     FOOD_RECOGNITION_MODEL: str = Field(default="yolov8n.pt")
     FOOD_RECOGNITION_CONFIDENCE: float = Field(default=0.5)
+    FOOD_RECOGNITION_BACKEND: str = Field(default="onnx")  # onnx (CPU only), tensorrt (CUDA only) or pytorch
+    FOOD_RECOGNITION_IMAGE_SIZE: int = Field(default=640)
+    
+    # OpenAI Request Scheduling
+    OPENAI_DISPATCHER_ENABLED: bool = Field(default=True)
+    OPENAI_MAX_CONCURRENCY: int = Field(default=10)
+    OPENAI_MAX_REQUESTS_PER_MINUTE: int = Field(default=500)
+    OPENAI_MAX_TOKENS_PER_MINUTE: int = Field(default=150000)
+    OPENAI_HTTP2: bool = Field(default=True)
+    OPENAI_MAX_CONNECTIONS: int = Field(default=100)
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=100)
+    OPENAI_KEEPALIVE_EXPIRY: float = Field(default=60.0)
+    OPENAI_CONNECT_TIMEOUT: float = Field(default=5.0)
+    OPENAI_READ_TIMEOUT: float = Field(default=120.0)
+    OPENAI_RETRY_ATTEMPTS: int = Field(default=5)
+    OPENAI_PRIMARY_RETRY_ATTEMPTS: int = Field(default=3)  # chat, before the fallback model
+    OPENAI_BREAKER_FAIL_MAX: int = Field(default=10)
+    OPENAI_BREAKER_RESET_TIMEOUT: float = Field(default=30.0)
+    
+    # Response Cache
+    RESPONSE_CACHE_ENABLED: bool = Field(default=True)
+    RESPONSE_CACHE_BACKEND: str = Field(default="memory")  # memory or redis
+    RESPONSE_CACHE_TTL: int = Field(default=3600)
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=1024)
+    SEMANTIC_CACHE_ENABLED: bool = Field(default=False)
+    SEMANTIC_CACHE_THRESHOLD: float = Field(default=0.95)
+    EMBEDDING_MODEL: str = Field(default="text-embedding-3-small")
     
     # Portion Estimation
     PORTION_ESTIMATION_METHOD: str = Field(default="reference_object")
     DEPTH_ESTIMATION_MODEL: str = Field(default="MiDaS_small")
+    DEPTH_MODEL_SHA256: str = Field(default="")  # pin the MiDaS checkpoint (else recorded digest)
+    DEPTH_MODEL_COMPILE: bool = Field(default=False)  # torch.compile on CUDA
+    DEPTH_MODEL_CUDA_GRAPH: bool = Field(default=True)  # ignored when compiled
+    
+    # Vision models load on first use; list names here to prewarm after startup
+    WARM_MODELS: str = Field(default="")  # e.g. food_recognition,depth_estimation
+    PRELOAD_MODELS: bool = Field(default=False)  # load CPU weights before fork
+    
+    # Inference thread pool
+    INFERENCE_WORKERS: int = Field(default=4)
+    
+    # Food detection micro-batching
+    BATCH_MAX_SIZE: int = Field(default=8)
+    BATCH_WINDOW_MS: int = Field(default=10)
     
     # Database
     POSTGRES_HOST: str = Field(default="localhost")
@@ -66,23 +115,111 @@ class Settings(BaseSettings):
     # Model Cache
     MODEL_CACHE_DIR: str = Field(default="./models")
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = True
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=True,
+        frozen=True
+    )
+    
+    # Derived values, computed once after load
+    _database_url: str = PrivateAttr(default="")
+    _allowed_image_types: FrozenSet[str] = PrivateAttr(default=frozenset())
+    
+    def model_post_init(self, __context: Any) -> None:
+        """Precompute derived settings so property access is a plain read."""
+        self._database_url = self.DATABASE_URL or (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        )
+        self._allowed_image_types = frozenset(self.ALLOWED_IMAGE_TYPES.split(","))
     
     @property
     def database_url(self) -> str:
         """Construct database URL if not provided."""
-        if self.DATABASE_URL:
-            return self.DATABASE_URL
-        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        return self._database_url
     
     @property
-    def allowed_image_types_list(self) -> list:
-        """Get allowed image types as a list."""
-        return self.ALLOWED_IMAGE_TYPES.split(",")
+    def allowed_image_types(self) -> FrozenSet[str]:
+        """Get allowed image types as a set."""
+        return self._allowed_image_types
+
+
+# Resolved settings cache, reused while .env and the environment are unchanged
+SETTINGS_CACHE_FILE = Path(".settings.cache.json")
+SETTINGS_CACHE_VERSION = "2"
+
+# Credentials are never written to the cache; connection strings can embed them
+SECRET_FIELD_PATTERN = re.compile(r"(_KEY|_SECRET|_TOKEN|_URL|_URI)$|PASSWORD")
+SECRET_FIELDS = frozenset(
+    name for name in Settings.model_fields if SECRET_FIELD_PATTERN.search(name)
+)
+
+
+def _settings_cache_key() -> str:
+    """Hash the inputs Settings is resolved from, including its schema."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(SETTINGS_CACHE_VERSION.encode())
+    
+    # Field names, types and defaults, so code changes invalidate the cache
+    digest.update(json.dumps(Settings.model_json_schema(), sort_keys=True).encode())
+    for name, field in sorted(Settings.model_fields.items()):
+        digest.update(f"\0{name}:{field.annotation!r}={field.default!r}".encode())
+    
+    env_file = Path(Settings.model_config["env_file"])
+    if env_file.is_file():
+        digest.update(env_file.read_bytes())
+    
+    for name in sorted(Settings.model_fields):
+        digest.update(f"\0{name}={os.environ.get(name, '')}".encode())
+    
+    return digest.hexdigest()
+
+
+def load_settings() -> Settings:
+    """
+    Load settings, reusing the cached resolution when inputs match.
+    
+    On a cache hit the values are restored with model_construct, skipping
+    validation. Values supplied through environment variables and secret
+    fields (keys, passwords, connection strings) are never written to the
+    cache; they are re-read from the environment or .env and coerced
+    individually on every load. Any cache problem falls back to a normal load.
+    """
+    key = _settings_cache_key()
+    from_env = {name for name in Settings.model_fields if name in os.environ}
+    uncached = from_env | SECRET_FIELDS
+    
+    try:
+        cached = json.loads(SETTINGS_CACHE_FILE.read_text())
+        if cached.get("key") == key:
+            values = cached["values"]
+            
+            env_file = Path(Settings.model_config["env_file"])
+            file_values = dotenv_values(env_file) if env_file.is_file() else {}
+            
+            for name in uncached:
+                raw = os.environ.get(name, file_values.get(name))
+                if raw is None:
+                    continue  # model_construct fills in the default
+                annotation = Settings.model_fields[name].annotation
+                values[name] = TypeAdapter(annotation).validate_python(raw)
+            return Settings.model_construct(**values)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    loaded = Settings()
+    
+    try:
+        payload = json.dumps({"key": key, "values": loaded.model_dump(exclude=uncached)})
+        fd = os.open(SETTINGS_CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as cache_file:
+            cache_file.write(payload)
+    except OSError:
+        pass  # Read-only filesystem, just skip caching
+    
+    return loaded
 
 
 # Global settings instance
-settings = Settings()
+settings = load_settings()
@@ -0,0 +1,14 @@
+"""
+FastAPI Dependencies
+
+Accessors for the shared services created in the application lifespan.
+"""
+
+from fastapi import Request
+
+from app.services.genai_service import GenAIService
+
+
+def get_genai_service(request: Request) -> GenAIService:
+    """The GenAI service shared by all requests."""
+    return request.app.state.genai_service
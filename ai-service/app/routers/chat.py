@@ -6,23 +6,26 @@ and natural language queries.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException
+from typing import Tuple, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from app.dependencies import get_genai_service
 from app.services.genai_service import GenAIService
+from app.utils.streaming import SSE_HEADERS, sse_events
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-genai_service = GenAIService()
 
 
 class MessageInput(BaseModel):
     """Input model for chat messages."""
     message: str = Field(..., min_length=1, max_length=2000)
-    conversation_history: List[Dict[str, str]] = Field(default=[])
-    user_context: Dict[str, Any] = Field(default={})
+    conversation_history: Tuple[Dict[str, str], ...] = ()
+    user_context: Dict[str, Any] = Field(default_factory=dict)
+    stream: bool = False
 
 
 class ChatResponse(BaseModel):
@@ -36,20 +39,41 @@ class QuickQueryInput(BaseModel):
     """Input model for quick queries."""
     query: str = Field(..., min_length=1, max_length=500)
     user_context: Optional[Dict[str, Any]] = None
+    stream: bool = False
 
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_completion(input_data: MessageInput):
+@router.post(
+    "/chat",
+    response_model=None,
+    responses={200: {"model": ChatResponse}}
+)
+async def chat_completion(
+    input_data: MessageInput,
+    genai_service: GenAIService = Depends(get_genai_service)
+):
     """
     Send a message to the NutriVision AI assistant.
     
     - **message**: User's message
     - **conversation_history**: Previous messages for context
     - **user_context**: User profile and preferences
+    - **stream**: Stream the response as Server-Sent Events
     
     Returns AI-generated response based on user's nutrition
     and fitness context.
     """
+    if input_data.stream:
+        events = genai_service.stream_chat_completion(
+            message=input_data.message,
+            conversation_history=input_data.conversation_history,
+            user_context=input_data.user_context
+        )
+        return StreamingResponse(
+            sse_events(events),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
     try:
         result = await genai_service.chat_completion(
             message=input_data.message,
@@ -57,7 +81,8 @@ async def chat_completion(input_data: MessageInput):
             user_context=input_data.user_context
         )
         
-        return ChatResponse(
+        # Result is built by trusted service code, skip re-validation
+        return ChatResponse.model_construct(
             response=result['response'],
             model=result['model'],
             tokens_used=result['tokens_used']
@@ -72,15 +97,30 @@ async def chat_completion(input_data: MessageInput):
 
 
 @router.post("/quick-query")
-async def quick_query(input_data: QuickQueryInput):
+async def quick_query(
+    input_data: QuickQueryInput,
+    genai_service: GenAIService = Depends(get_genai_service)
+):
     """
     Quick one-off query without conversation history.
     
     - **query**: User's question
     - **user_context**: Optional user context for personalization
+    - **stream**: Stream the response as Server-Sent Events
     
     Returns concise answer to nutrition/fitness questions.
     """
+    if input_data.stream:
+        events = genai_service.stream_quick_query(
+            query=input_data.query,
+            user_context=input_data.user_context
+        )
+        return StreamingResponse(
+            sse_events(events),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
     try:
         result = await genai_service.quick_query(
             query=input_data.query,
@@ -11,12 +11,40 @@ from fastapi import APIRouter, File, UploadFile, HTTPException, Request
 from pydantic import BaseModel
 
 from app.config import settings
-from app.services.food_detection import FoodDetectionService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Upload read size per chunk
+READ_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_image(image: UploadFile) -> bytes:
+    """
+    Read an uploaded image in bounded chunks.
+    
+    Rejects the upload with 413 as soon as it exceeds MAX_IMAGE_SIZE,
+    so oversized files are never fully buffered in memory.
+    """
+    limit = settings.MAX_IMAGE_SIZE
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size: {limit / (1024*1024)}MB"
+    )
+    
+    # Short-circuit when the server already knows the size
+    if image.size is not None and image.size > limit:
+        raise too_large
+    
+    buf = bytearray()
+    while chunk := await image.read(READ_CHUNK_SIZE):
+        if len(buf) + len(chunk) > limit:
+            raise too_large
+        buf += chunk
+    
+    return bytes(buf)
+
 
 class AnalysisResponse(BaseModel):
     """Response model for food analysis."""
@@ -25,7 +53,11 @@ class AnalysisResponse(BaseModel):
     image_dimensions: dict
 
 
-@router.post("/analyze-image", response_model=AnalysisResponse)
+@router.post(
+    "/analyze-image",
+    response_model=None,
+    responses={200: {"model": AnalysisResponse}}
+)
 async def analyze_food_image(
     request: Request,
     image: UploadFile = File(...),
@@ -41,26 +73,18 @@ async def analyze_food_image(
     and estimated portion sizes in grams.
     """
     # Validate file type
-    if image.content_type not in settings.allowed_image_types_list:
+    if image.content_type not in settings.allowed_image_types:
         raise HTTPException(
             status_code=400,
             detail=f"Invalid file type. Allowed: {settings.ALLOWED_IMAGE_TYPES}"
         )
     
-    # Validate file size
-    contents = await image.read()
-    if len(contents) > settings.MAX_IMAGE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {settings.MAX_IMAGE_SIZE / (1024*1024)}MB"
-        )
+    # Validate file size while reading
+    contents = await _read_image(image)
     
     try:
-        # Get model loader from app state
-        model_loader = request.app.state.model_loader
-        
-        # Initialize food detection service
-        detection_service = FoodDetectionService(model_loader)
+        # Shared detection service created at startup
+        detection_service = request.app.state.detection_service
         
         # Analyze image
         result = await detection_service.analyze_image(
@@ -68,7 +92,8 @@ async def analyze_food_image(
             include_portion_estimate=include_portion_estimate
         )
         
-        return result
+        # Result is built by trusted service code, skip re-validation
+        return AnalysisResponse.model_construct(**result)
         
     except Exception as e:
         logger.error(f"Food analysis error: {e}")
@@ -92,11 +117,10 @@ async def estimate_portion(
     
     Returns estimated portion size in grams.
     """
-    contents = await image.read()
+    contents = await _read_image(image)
     
     try:
-        model_loader = request.app.state.model_loader
-        detection_service = FoodDetectionService(model_loader)
+        detection_service = request.app.state.detection_service
         
         result = await detection_service.analyze_image(contents)
         
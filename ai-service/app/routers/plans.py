@@ -6,16 +6,18 @@ and workout plans using GenAI.
 """
 
 import logging
-from typing import Dict, Any, Optional, List
-from fastapi import APIRouter, HTTPException
+from typing import Dict, Any, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from app.dependencies import get_genai_service
 from app.services.genai_service import GenAIService
+from app.utils.streaming import SSE_HEADERS, sse_events
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-genai_service = GenAIService()
 
 
 class MealPlanInput(BaseModel):
@@ -23,6 +25,7 @@ class MealPlanInput(BaseModel):
     user_context: Dict[str, Any] = Field(...)
     days: int = Field(default=7, ge=1, le=7)
     include_snacks: bool = Field(default=True)
+    stream: bool = False
 
 
 class WorkoutPlanInput(BaseModel):
@@ -30,6 +33,7 @@ class WorkoutPlanInput(BaseModel):
     user_context: Dict[str, Any] = Field(...)
     days: int = Field(default=7, ge=1, le=7)
     preferences: Optional[Dict[str, Any]] = Field(default=None)
+    stream: bool = False
 
 
 class QuickMealInput(BaseModel):
@@ -37,22 +41,38 @@ class QuickMealInput(BaseModel):
     meal_type: str = Field(..., pattern="^(breakfast|lunch|dinner|snack)$")
     max_calories: int = Field(default=500, ge=100, le=2000)
     diet_type: str = Field(default="omnivore")
-    exclude_ingredients: List[str] = Field(default=[])
-    allergies: List[str] = Field(default=[])
+    exclude_ingredients: Tuple[str, ...] = ()
+    allergies: Tuple[str, ...] = ()
 
 
 @router.post("/generate-meal-plan")
-async def generate_meal_plan(input_data: MealPlanInput):
+async def generate_meal_plan(
+    input_data: MealPlanInput,
+    genai_service: GenAIService = Depends(get_genai_service)
+):
     """
     Generate a personalized meal plan.
     
     - **user_context**: User profile with goals and preferences
     - **days**: Number of days (1-7)
     - **include_snacks**: Whether to include snack recommendations
+    - **stream**: Stream each day as Server-Sent Events as it completes
     
     Returns a complete meal plan with recipes, nutritional info,
     and grocery list.
     """
+    if input_data.stream:
+        events = genai_service.stream_meal_plan(
+            user_context=input_data.user_context,
+            days=input_data.days,
+            include_snacks=input_data.include_snacks
+        )
+        return StreamingResponse(
+            sse_events(events),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
     try:
         result = await genai_service.generate_meal_plan(
             user_context=input_data.user_context,
@@ -71,17 +91,33 @@ async def generate_meal_plan(input_data: MealPlanInput):
 
 
 @router.post("/generate-workout-plan")
-async def generate_workout_plan(input_data: WorkoutPlanInput):
+async def generate_workout_plan(
+    input_data: WorkoutPlanInput,
+    genai_service: GenAIService = Depends(get_genai_service)
+):
     """
     Generate a personalized workout plan.
     
     - **user_context**: User profile with fitness goals
     - **days**: Number of days (1-7)
     - **preferences**: Workout preferences (difficulty, equipment, etc.)
+    - **stream**: Stream each day as Server-Sent Events as it completes
     
     Returns a complete workout plan with exercises, sets, reps,
     and progression tips.
     """
+    if input_data.stream:
+        events = genai_service.stream_workout_plan(
+            user_context=input_data.user_context,
+            days=input_data.days,
+            preferences=input_data.preferences
+        )
+        return StreamingResponse(
+            sse_events(events),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
     try:
         result = await genai_service.generate_workout_plan(
             user_context=input_data.user_context,
@@ -100,7 +136,10 @@ async def generate_workout_plan(input_data: WorkoutPlanInput):
 
 
 @router.post("/quick-meal-suggestion")
-async def quick_meal_suggestion(input_data: QuickMealInput):
+async def quick_meal_suggestion(
+    input_data: QuickMealInput,
+    genai_service: GenAIService = Depends(get_genai_service)
+):
     """
     Get quick meal suggestions based on criteria.
     
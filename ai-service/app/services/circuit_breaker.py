@@ -0,0 +1,90 @@
+"""
+Circuit Breaker
+
+Stops sending calls to a failing dependency for a cool-off period,
+so callers can switch to a fallback immediately instead of waiting
+on requests that are likely to fail.
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for async calls.
+    
+    After `fail_max` consecutive failures the circuit opens and calls
+    are rejected with CircuitOpenError. Once `reset_timeout` seconds
+    have passed, one trial call is let through: success closes the
+    circuit, failure keeps it open for another timeout.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        fail_max: int,
+        reset_timeout: float,
+        failure_types: Tuple[Type[BaseException], ...] = (Exception,)
+    ):
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failure_types = failure_types
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+    
+    @property
+    def is_open(self) -> bool:
+        return (
+            self._opened_at is not None
+            and time.monotonic() - self._opened_at < self.reset_timeout
+        )
+    
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run `func` through the breaker.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        opened_at = self._opened_at
+        if opened_at is not None:
+            if self.is_open:
+                raise CircuitOpenError(f"Circuit '{self.name}' is open")
+            # Half-open: hold other callers off while this trial runs
+            self._opened_at = time.monotonic()
+        
+        try:
+            result = await func(*args, **kwargs)
+        except self.failure_types:
+            self._record_failure()
+            raise
+        except BaseException:
+            # Not a dependency failure (bad request, cancellation), so the
+            # trial has no verdict; reopen it for the next caller
+            if opened_at is not None:
+                self._opened_at = opened_at
+            raise
+        
+        if self._opened_at is not None:
+            logger.info(f"Circuit '{self.name}' closed")
+        self._failures = 0
+        self._opened_at = None
+        return result
+    
+    def _record_failure(self):
+        self._failures += 1
+        if self._opened_at is not None or self._failures >= self.fail_max:
+            if self._opened_at is None:
+                logger.warning(
+                    f"Circuit '{self.name}' opened after {self._failures} failures"
+                )
+            self._opened_at = time.monotonic()
@@ -0,0 +1,43 @@
+"""
+User Context Canonicalization
+
+Deterministic serialization of user context, so equal contexts hash
+to the same cache key regardless of key order or the order of set-like
+lists (the prompts render those sorted).
+"""
+
+import hashlib
+from typing import Any, Dict, Optional
+import orjson
+
+
+# dietaryPreferences lists whose order carries no meaning
+ORDER_INSENSITIVE_DIET_FIELDS = ("allergies", "dietaryRestrictions", "dislikedFoods")
+
+
+def canonicalize_user_context(user_context: Optional[Dict[str, Any]]) -> bytes:
+    """
+    Serialize user context as JSON with keys sorted at every level and
+    order-insensitive diet lists sorted.
+    """
+    user_context = user_context or {}
+    diet = user_context.get('dietaryPreferences')
+    
+    if isinstance(diet, dict) and any(
+        isinstance(diet.get(field), (list, tuple)) for field in ORDER_INSENSITIVE_DIET_FIELDS
+    ):
+        diet = dict(diet)
+        for field in ORDER_INSENSITIVE_DIET_FIELDS:
+            if isinstance(diet.get(field), (list, tuple)):
+                diet[field] = sorted(diet[field], key=str)
+        user_context = {**user_context, 'dietaryPreferences': diet}
+    
+    return orjson.dumps(user_context, option=orjson.OPT_SORT_KEYS)
+
+
+def user_context_digest(user_context: Optional[Dict[str, Any]]) -> str:
+    """Short stable hash of the canonical user context."""
+    return hashlib.blake2b(
+        canonicalize_user_context(user_context),
+        digest_size=16
+    ).hexdigest()
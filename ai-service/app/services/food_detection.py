@@ -5,15 +5,13 @@ Handles food image analysis using YOLOv8 model,
 detecting foods and estimating portions.
 """
 
+import asyncio
 import logging
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from PIL import Image
-import io
 import cv2
 
-from app.config import settings
-
 logger = logging.getLogger(__name__)
 
 
@@ -43,13 +41,67 @@ FOOD_CLASSES = {
     'milk': {'calories_per_100g': 42, 'default_weight': 244},
 }
 
+# Per-field lookups derived from FOOD_CLASSES for the per-detection hot path
+FOOD_DEFAULT_WEIGHT = {k: v['default_weight'] for k, v in FOOD_CLASSES.items()}
+FOOD_KCAL_100G = {k: v['calories_per_100g'] for k, v in FOOD_CLASSES.items()}
+
+# Area-based scale factors in this range are trusted without running depth
+DEPTH_SKIP_SCALE_RANGE = (0.8, 1.5)
+
+# Context kept around a bounding box when cropping for depth estimation
+DEPTH_CROP_PADDING = 20
+
+# Fuzzy mapping for common variations of detected class names
+FOOD_CLASS_MAPPINGS = {
+    'hot dog': 'hotdog',
+    'french fries': 'fries',
+    'doughnut': 'donut',
+    'cup': 'coffee',  # Could be a beverage
+    'bowl': 'soup',   # Could be soup or salad
+    'plate': None,    # Generic, skip
+}
+
+
+@lru_cache(maxsize=256)
+def _map_food(detected_lower: str) -> Optional[str]:
+    """Map an already-lowercased detected class to a known food class."""
+    # Direct mapping
+    if detected_lower in FOOD_CLASSES:
+        return detected_lower
+    
+    return FOOD_CLASS_MAPPINGS.get(detected_lower, detected_lower)
+
+
+def bbox_depth_region(
+    depth_map: np.ndarray,
+    image_shape: Tuple[int, ...],
+    bbox: Tuple[int, int, int, int]
+) -> np.ndarray:
+    """
+    Slice the depth map under a bounding box given in image coordinates.
+    
+    The box is scaled to the depth map resolution and clamped to at least
+    one pixel inside it, so tiny or edge boxes never yield an empty slice
+    (whose mean would be NaN).
+    """
+    height, width = depth_map.shape[:2]
+    sy = height / image_shape[0]
+    sx = width / image_shape[1]
+    x1, y1, x2, y2 = bbox
+    
+    top = min(max(int(y1 * sy), 0), height - 1)
+    left = min(max(int(x1 * sx), 0), width - 1)
+    bottom = max(int(y2 * sy), top + 1)
+    right = max(int(x2 * sx), left + 1)
+    return depth_map[top:bottom, left:right]
+
 
 class FoodDetectionService:
     """Service for detecting foods in images using computer vision."""
     
-    def __init__(self, model_loader):
+    def __init__(self, model_loader, batcher):
         self.model_loader = model_loader
-        self.confidence_threshold = settings.FOOD_RECOGNITION_CONFIDENCE
+        self.batcher = batcher
     
     async def analyze_image(
         self,
@@ -67,40 +119,37 @@ class FoodDetectionService:
             Dictionary with detected foods and portions
         """
         try:
-            # Load and preprocess image
-            image = Image.open(io.BytesIO(image_data))
-            image_np = np.array(image)
+            # Decode straight into a contiguous ndarray
+            buffer = np.frombuffer(image_data, dtype=np.uint8)
+            image_np = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
             
-            # Get food recognition model
-            food_model = self.model_loader.get_model('food_recognition')
+            if image_np is None:
+                raise ValueError("Failed to decode image")
             
-            if food_model is None:
-                raise ValueError("Food recognition model not loaded")
+            # Convert in place; IMREAD_COLOR always yields 3 channels
+            cv2.cvtColor(image_np, cv2.COLOR_BGR2RGB, dst=image_np)
+            height, width = image_np.shape[:2]
             
-            # Run detection
-            results = food_model(image_np, conf=self.confidence_threshold)
+            # Run detection through the shared micro-batcher
+            result = await self.batcher.submit(image_np)
             
             # Process results
             detected_foods = []
             portion_estimates = {}
             
-            for result in results:
-                boxes = result.boxes
-                
-                if boxes is None or len(boxes) == 0:
-                    continue
+            boxes = result.boxes
+            
+            if boxes is not None and len(boxes) > 0:
+                # Pull all boxes off the device in one transfer each and
+                # convert to native Python values in bulk
+                xyxy = boxes.xyxy.cpu().numpy().tolist()
+                cls_ids = boxes.cls.cpu().numpy().astype(np.int32).tolist()
+                confs = boxes.conf.cpu().numpy().tolist()
+                names = result.names
                 
-                for box in boxes:
-                    # Get class name and confidence
-                    class_id = int(box.cls[0])
-                    class_name = result.names[class_id]
-                    confidence = float(box.conf[0])
-                    
-                    # Get bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].tolist()
-                    
+                for (x1, y1, x2, y2), class_id, confidence in zip(xyxy, cls_ids, confs):
                     # Map to food if possible
-                    food_name = self._map_to_food_class(class_name)
+                    food_name = self._map_to_food_class(names[class_id])
                     
                     if food_name:
                         food_info = {
@@ -129,8 +178,8 @@ class FoodDetectionService:
                 'detected_foods': detected_foods,
                 'portion_estimates': portion_estimates,
                 'image_dimensions': {
-                    'width': image.width,
-                    'height': image.height
+                    'width': width,
+                    'height': height
                 }
             }
             
@@ -140,23 +189,7 @@ class FoodDetectionService:
     
     def _map_to_food_class(self, detected_class: str) -> Optional[str]:
         """Map detected class to known food class."""
-        # Direct mapping
-        detected_lower = detected_class.lower()
-        
-        if detected_lower in FOOD_CLASSES:
-            return detected_lower
-        
-        # Fuzzy mapping for common variations
-        mappings = {
-            'hot dog': 'hotdog',
-            'french fries': 'fries',
-            'doughnut': 'donut',
-            'cup': 'coffee',  # Could be a beverage
-            'bowl': 'soup',   # Could be soup or salad
-            'plate': None,    # Generic, skip
-        }
-        
-        return mappings.get(detected_lower, detected_lower)
+        return _map_food(detected_class.lower())
     
     async def _estimate_portion(
         self,
@@ -179,28 +212,39 @@ class FoodDetectionService:
         food_area = (x2 - x1) * (y2 - y1)
         area_ratio = food_area / image_area
         
-        # Get default weight for this food
-        if food_name in FOOD_CLASSES:
-            default_weight = FOOD_CLASSES[food_name]['default_weight']
-        else:
-            default_weight = 100  # Default to 100g
+        # Get default weight for this food (default to 100g)
+        default_weight = FOOD_DEFAULT_WEIGHT.get(food_name, 100)
         
         # Scale based on area (simplified estimation)
         # Assumes typical food takes up ~15-20% of frame
         typical_ratio = 0.15
         scale_factor = area_ratio / typical_ratio
         
+        # Only refine with depth when the area heuristic is unreliable
+        low, high = DEPTH_SKIP_SCALE_RANGE
+        needs_depth = not (low <= scale_factor <= high)
+        
         # Clamp to reasonable range
-        scale_factor = max(0.5, min(2.0, scale_factor))
+        scale_factor = 0.5 if scale_factor < 0.5 else 2.0 if scale_factor > 2.0 else scale_factor
         
         estimated_weight = default_weight * scale_factor
         
         # Try depth-based estimation if available
-        depth_model = self.model_loader.get_model('depth_estimation')
+        # Loaded on first use, so skip the lookup when depth isn't needed
+        depth_model = (
+            await self.model_loader.get_model('depth_estimation') if needs_depth else None
+        )
         if depth_model is not None:
             try:
+                # Run depth on a padded crop around the food only
+                pad = DEPTH_CROP_PADDING
+                cx1, cy1 = max(0, int(x1) - pad), max(0, int(y1) - pad)
+                cx2, cy2 = int(x2) + pad, int(y2) + pad
+                crop = image[cy1:cy2, cx1:cx2]
+                crop_bbox = (x1 - cx1, y1 - cy1, x2 - cx1, y2 - cy1)
+                
                 depth_estimate = await self._depth_based_estimation(
-                    image, bbox, depth_model
+                    crop, crop_bbox, depth_model
                 )
                 if depth_estimate:
                     # Blend with area-based estimate
@@ -208,7 +252,8 @@ class FoodDetectionService:
             except Exception as e:
                 logger.warning(f"Depth estimation failed: {e}")
         
-        return round(estimated_weight, 1)
+        # Round half up to one decimal (weights are always positive)
+        return int(estimated_weight * 10 + 0.5) / 10
     
     async def _depth_based_estimation(
         self,
@@ -226,35 +271,45 @@ class FoodDetectionService:
         
         model = depth_model['model']
         transform = depth_model['transform']
+        graph = depth_model.get('graph')
         
-        # Convert to RGB if needed
-        if len(image.shape) == 2:
-            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-        elif image.shape[2] == 4:
-            image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+        # Image is already 3-channel RGB (decoded with IMREAD_COLOR)
+        model_input = image
+        if graph is not None:
+            # The captured graph only takes its fixed square input shape
+            size = depth_model['input_size']
+            model_input = cv2.resize(image, (size, size), interpolation=cv2.INTER_LINEAR)
         
         # Transform image
-        input_batch = transform(image)
+        input_batch = transform(model_input)
         
-        # Move to device
-        device = next(model.parameters()).device
-        input_batch = input_batch.to(device)
+        # Move to the model's device and precision (FP16 on CUDA and MPS)
+        param = next(model.parameters())
+        device = param.device
+        input_batch = input_batch.to(device, dtype=param.dtype)
         
-        # Run inference
-        with torch.no_grad():
-            prediction = model(input_batch)
-            prediction = torch.nn.functional.interpolate(
-                prediction.unsqueeze(1),
-                size=image.shape[:2],
-                mode="bicubic",
-                align_corners=False,
-            ).squeeze()
+        def run_inference() -> np.ndarray:
+            if graph is not None:
+                with torch.inference_mode(), depth_model['graph_lock']:
+                    depth_model['static_input'].copy_(input_batch)
+                    graph.replay()
+                    return depth_model['static_output'].squeeze().float().cpu().numpy()
+            
+            with torch.inference_mode(), torch.autocast(
+                device_type=device.type,
+                dtype=torch.float16,
+                enabled=device.type == 'cuda'
+            ):
+                prediction = model(input_batch)
+            return prediction.squeeze().float().cpu().numpy()
         
-        depth_map = prediction.cpu().numpy()
+        # Run inference off the event loop (depth map stays at native
+        # MiDaS resolution; averages don't need a full-size upsample)
+        depth_map = await asyncio.to_thread(run_inference)
         
-        # Extract depth in bounding box region
+        # Extract depth in bounding box region, scaled to the depth map
         x1, y1, x2, y2 = [int(v) for v in bbox]
-        food_depth = depth_map[y1:y2, x1:x2]
+        food_depth = bbox_depth_region(depth_map, image.shape, (x1, y1, x2, y2))
         
         # Calculate approximate volume
         avg_depth = np.mean(food_depth)
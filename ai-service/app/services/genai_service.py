@@ -8,25 +8,122 @@ Handles interactions with Large Language Models for:
 - Quick nutrition queries
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from openai import AsyncOpenAI
-import json
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional, Sequence, Tuple
+import httpx
+import ijson
+import orjson
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential,
+)
 
 from app.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.context import canonicalize_user_context, user_context_digest
+from app.services.openai_dispatcher import OpenAIDispatcher
+from app.services.plan_schemas import (
+    MEAL_PLAN_RESPONSE_FORMAT,
+    WORKOUT_PLAN_RESPONSE_FORMAT,
+)
 from app.services.prompts import PromptTemplates
+from app.services.response_cache import (
+    ResponseCache,
+    SemanticIndex,
+    make_cache_key,
+    normalize_list,
+    normalize_text,
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Distinct user contexts whose rendered chat system message is kept
+CHAT_SYSTEM_MESSAGE_CACHE_SIZE = 1024
+
+# Transient API failures worth retrying (timeouts, network, 429, 5xx)
+RETRYABLE_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+    InternalServerError,
+)
+
+
+def create_openai_client() -> AsyncOpenAI:
+    """
+    Create the process-wide OpenAI client.
+    
+    Uses HTTP/2 so concurrent completions multiplex over a few
+    long-lived connections; share one instance so those connections
+    are reused.
+    """
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        # Retries are handled with backoff in GenAIService._create
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            http2=settings.OPENAI_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.OPENAI_CONNECT_TIMEOUT,
+                read=settings.OPENAI_READ_TIMEOUT,
+                write=10.0,
+                pool=5.0
+            )
+        )
+    )
+
+
 class GenAIService:
     """Service for GenAI-powered features using LLM APIs."""
     
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        cache: Optional[ResponseCache] = None,
+        dispatcher: Optional[OpenAIDispatcher] = None
+    ):
+        self.client = client
+        self.dispatcher = dispatcher
         self.default_model = settings.DEFAULT_LLM_MODEL
         self.fallback_model = settings.FALLBACK_LLM_MODEL
         self.prompts = PromptTemplates()
+        self.cache = cache
+        self.semantic_index = (
+            SemanticIndex() if cache is not None and settings.SEMANTIC_CACHE_ENABLED else None
+        )
+        # Generations in progress, shared by concurrent identical requests
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Rendered chat system messages, keyed on the canonical user context
+        self._chat_system_message = lru_cache(maxsize=CHAT_SYSTEM_MESSAGE_CACHE_SIZE)(
+            self._render_chat_system_message
+        )
+        # Sends chat straight to the fallback model while the primary is failing
+        self.primary_breaker = CircuitBreaker(
+            'primary_model',
+            fail_max=settings.OPENAI_BREAKER_FAIL_MAX,
+            reset_timeout=settings.OPENAI_BREAKER_RESET_TIMEOUT,
+            failure_types=RETRYABLE_ERRORS
+        )
     
     async def chat_completion(
         self,
@@ -45,17 +142,13 @@ class GenAIService:
         Returns:
             Dictionary with response and metadata
         """
+        messages = self._chat_messages(message, conversation_history, user_context)
+        
         try:
-            # Build system prompt with user context
-            system_prompt = self.prompts.get_chat_system_prompt(user_context)
-            
-            # Prepare messages
-            messages = [{"role": "system", "content": system_prompt}]
-            messages.extend(conversation_history)
-            messages.append({"role": "user", "content": message})
-            
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(
+            # Call OpenAI API with a short retry budget (rejected immediately
+            # while the breaker is open), then fall back to the fallback model
+            response = await self.primary_breaker.call(
+                self._create_primary,
                 model=self.default_model,
                 messages=messages,
                 temperature=0.7,
@@ -74,7 +167,7 @@ class GenAIService:
             logger.error(f"Chat completion error: {e}")
             # Try fallback model
             try:
-                response = await self.client.chat.completions.create(
+                response = await self._create(
                     model=self.fallback_model,
                     messages=messages,
                     temperature=0.7,
@@ -89,6 +182,158 @@ class GenAIService:
                 logger.error(f"Fallback model error: {fallback_error}")
                 raise
     
+    async def stream_chat_completion(
+        self,
+        message: str,
+        conversation_history: List[Dict[str, str]],
+        user_context: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat response as it is generated.
+        
+        Args:
+            message: User's message
+            conversation_history: Previous messages in the conversation
+            user_context: User profile, goals, and preferences
+            
+        Yields:
+            Delta events with content, then a final event with the full
+            response and metadata
+        """
+        messages = self._chat_messages(message, conversation_history, user_context)
+        
+        try:
+            stream = await self.primary_breaker.call(
+                self._create_stream,
+                self._create_primary,
+                model=self.default_model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000,
+                presence_penalty=0.1,
+                frequency_penalty=0.1
+            )
+        except Exception as e:
+            logger.error(f"Chat completion error: {e}")
+            # Try fallback model
+            stream = await self._create_stream(
+                model=self.fallback_model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1000
+            )
+        
+        async for event in self._iter_stream(stream):
+            yield event
+    
+    def _chat_messages(
+        self,
+        message: str,
+        conversation_history: Sequence[Dict[str, str]],
+        user_context: Dict[str, Any]
+    ) -> List[Dict[str, str]]:
+        """Build the chat message list in one pre-sized allocation."""
+        n = len(conversation_history)
+        messages: List[Dict[str, str]] = [None] * (n + 2)
+        messages[0] = self._chat_system_message(canonicalize_user_context(user_context))
+        messages[1:n + 1] = conversation_history
+        messages[n + 1] = {"role": "user", "content": message}
+        return messages
+    
+    def _render_chat_system_message(self, canonical_context: bytes) -> Dict[str, str]:
+        """
+        Render the chat system message for a canonical user context.
+        
+        Wrapped in a per-instance LRU cache, so the returned dict is
+        shared between requests and must not be mutated.
+        """
+        user_context = orjson.loads(canonical_context)
+        return {"role": "system", "content": self.prompts.get_chat_system_prompt(user_context)}
+    
+    @retry(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        wait=wait_random_exponential(min=1, max=60),
+        # No new attempt once the client's read timeout has been used up
+        stop=(
+            stop_after_attempt(settings.OPENAI_RETRY_ATTEMPTS)
+            | stop_after_delay(settings.OPENAI_READ_TIMEOUT)
+        ),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True
+    )
+    async def _create(self, **params) -> Any:
+        """
+        Create a chat completion, retrying transient failures with
+        jittered exponential backoff.
+        """
+        return await self._send(**params)
+    
+    @retry(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        wait=wait_random_exponential(min=0.5, max=4),
+        stop=stop_after_attempt(settings.OPENAI_PRIMARY_RETRY_ATTEMPTS),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True
+    )
+    async def _create_primary(self, **params) -> Any:
+        """
+        Create a chat completion on the primary path with a small retry
+        budget, so a persistent failure reaches the breaker and the
+        fallback model quickly.
+        """
+        return await self._send(**params)
+    
+    async def _send(self, **params) -> Any:
+        """
+        Make one chat completion attempt, scheduled by the dispatcher
+        when configured.
+        """
+        create = self.client.chat.completions.create
+        
+        if self.dispatcher is None:
+            return await create(**params)
+        
+        return await self.dispatcher.submit(create, **params)
+    
+    async def _create_stream(
+        self,
+        send: Optional[Callable[..., Awaitable[Any]]] = None,
+        **params
+    ) -> Any:
+        """
+        Open a streaming chat completion that reports usage at the end.
+        
+        `send` makes the request; it defaults to the retrying _create.
+        """
+        return await (send or self._create)(
+            stream=True,
+            stream_options={"include_usage": True},
+            **params
+        )
+    
+    async def _iter_stream(self, stream: Any) -> AsyncIterator[Dict[str, Any]]:
+        """Turn a completion stream into delta events plus a final summary."""
+        parts = []
+        model = None
+        tokens_used = 0
+        
+        async for chunk in stream:
+            model = chunk.model or model
+            if chunk.usage:
+                tokens_used = chunk.usage.total_tokens
+            if chunk.choices:
+                content = chunk.choices[0].delta.content
+                if content:
+                    parts.append(content)
+                    yield {'type': 'delta', 'content': content}
+        
+        yield {
+            'type': 'done',
+            'response': ''.join(parts),
+            'model': model,
+            'tokens_used': tokens_used
+        }
+    
     async def generate_meal_plan(
         self,
         user_context: Dict[str, Any],
@@ -107,30 +352,27 @@ class GenAIService:
             Dictionary with complete meal plan
         """
         try:
-            system_prompt = self.prompts.get_meal_plan_system_prompt()
-            user_prompt = self.prompts.get_meal_plan_user_prompt(
-                user_context, days, include_snacks
+            # Identical concurrent requests share one generation; plans are
+            # never cached, so asking again always produces a fresh plan
+            flight_key = make_cache_key(
+                'meal_plan', user_context_digest(user_context), days, include_snacks
             )
             
-            response = await self.client.chat.completions.create(
-                model=self.default_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.8,
-                max_tokens=4000,
-                response_format={"type": "json_object"}
-            )
-            
-            # Parse JSON response
-            meal_plan = json.loads(response.choices[0].message.content)
+            async def generate() -> Dict[str, Any]:
+                response = await self._create(
+                    **self._meal_plan_params(user_context, days, include_snacks)
+                )
+                
+                # Parse JSON response
+                meal_plan = orjson.loads(response.choices[0].message.content)
+                
+                return {
+                    'meal_plan': meal_plan,
+                    'model': response.model,
+                    'tokens_used': response.usage.total_tokens if response.usage else 0
+                }
             
-            return {
-                'meal_plan': meal_plan,
-                'model': response.model,
-                'tokens_used': response.usage.total_tokens if response.usage else 0
-            }
+            return await self._single_flight(flight_key, generate, cache=False)
             
         except Exception as e:
             logger.error(f"Meal plan generation error: {e}")
@@ -154,34 +396,174 @@ class GenAIService:
             Dictionary with complete workout plan
         """
         try:
-            system_prompt = self.prompts.get_workout_plan_system_prompt()
-            user_prompt = self.prompts.get_workout_plan_user_prompt(
-                user_context, days, preferences
+            # Identical concurrent requests share one generation; plans are
+            # never cached, so asking again always produces a fresh plan
+            flight_key = make_cache_key(
+                'workout_plan', user_context_digest(user_context), days, preferences
             )
             
-            response = await self.client.chat.completions.create(
-                model=self.default_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=4000,
-                response_format={"type": "json_object"}
-            )
+            async def generate() -> Dict[str, Any]:
+                response = await self._create(
+                    **self._workout_plan_params(user_context, days, preferences)
+                )
+                
+                # Parse JSON response
+                workout_plan = orjson.loads(response.choices[0].message.content)
+                
+                return {
+                    'workout_plan': workout_plan,
+                    'model': response.model,
+                    'tokens_used': response.usage.total_tokens if response.usage else 0
+                }
             
-            # Parse JSON response
-            workout_plan = json.loads(response.choices[0].message.content)
+            return await self._single_flight(flight_key, generate, cache=False)
             
-            return {
-                'workout_plan': workout_plan,
-                'model': response.model,
-                'tokens_used': response.usage.total_tokens if response.usage else 0
-            }
+        except Exception as e:
+            logger.error(f"Workout plan generation error: {e}")
+            raise
+    
+    async def stream_meal_plan(
+        self,
+        user_context: Dict[str, Any],
+        days: int = 7,
+        include_snacks: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a meal plan, emitting each day as soon as it is complete.
+        
+        Args:
+            user_context: User profile with goals and preferences
+            days: Number of days to generate (1-7)
+            include_snacks: Whether to include snack recommendations
             
+        Yields:
+            Day events with each parsed day, then a final event with the
+            complete meal plan and metadata
+        """
+        try:
+            stream = await self._create_stream(
+                **self._meal_plan_params(user_context, days, include_snacks)
+            )
+        except Exception as e:
+            logger.error(f"Meal plan generation error: {e}")
+            raise
+        
+        async for event in self._iter_plan_stream(stream, 'meal_plan'):
+            yield event
+    
+    async def stream_workout_plan(
+        self,
+        user_context: Dict[str, Any],
+        days: int = 7,
+        preferences: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a workout plan, emitting each day as soon as it is complete.
+        
+        Args:
+            user_context: User profile with fitness goals
+            days: Number of days to generate (1-7)
+            preferences: Additional workout preferences
+            
+        Yields:
+            Day events with each parsed day, then a final event with the
+            complete workout plan and metadata
+        """
+        try:
+            stream = await self._create_stream(
+                **self._workout_plan_params(user_context, days, preferences)
+            )
         except Exception as e:
             logger.error(f"Workout plan generation error: {e}")
             raise
+        
+        async for event in self._iter_plan_stream(stream, 'workout_plan'):
+            yield event
+    
+    def _meal_plan_params(
+        self,
+        user_context: Dict[str, Any],
+        days: int,
+        include_snacks: bool
+    ) -> Dict[str, Any]:
+        """Completion parameters for a meal plan request."""
+        return {
+            'model': self.default_model,
+            'messages': [
+                {"role": "system", "content": self.prompts.get_meal_plan_system_prompt()},
+                {"role": "user", "content": self.prompts.get_meal_plan_user_prompt(
+                    user_context, days, include_snacks
+                )}
+            ],
+            'temperature': 0.8,
+            'max_tokens': 4000,
+            'response_format': self._plan_response_format(MEAL_PLAN_RESPONSE_FORMAT)
+        }
+    
+    def _workout_plan_params(
+        self,
+        user_context: Dict[str, Any],
+        days: int,
+        preferences: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Completion parameters for a workout plan request."""
+        return {
+            'model': self.default_model,
+            'messages': [
+                {"role": "system", "content": self.prompts.get_workout_plan_system_prompt()},
+                {"role": "user", "content": self.prompts.get_workout_plan_user_prompt(
+                    user_context, days, preferences
+                )}
+            ],
+            'temperature': 0.7,
+            'max_tokens': 4000,
+            'response_format': self._plan_response_format(WORKOUT_PLAN_RESPONSE_FORMAT)
+        }
+    
+    @staticmethod
+    def _plan_response_format(schema_format: Dict[str, Any]) -> Dict[str, Any]:
+        """Strict JSON schema when the model supports it, JSON mode otherwise."""
+        if settings.STRUCTURED_OUTPUTS_ENABLED:
+            return schema_format
+        return {"type": "json_object"}
+    
+    async def _iter_plan_stream(
+        self,
+        stream: Any,
+        plan_key: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Incrementally parse a streamed plan, yielding each entry of its
+        "days" array as soon as the object closes.
+        """
+        parts = []
+        model = None
+        tokens_used = 0
+        
+        completed_days = ijson.sendable_list()
+        parser = ijson.items_coro(completed_days, 'days.item', use_float=True)
+        
+        async for chunk in stream:
+            model = chunk.model or model
+            if chunk.usage:
+                tokens_used = chunk.usage.total_tokens
+            if chunk.choices:
+                content = chunk.choices[0].delta.content
+                if content:
+                    parts.append(content)
+                    parser.send(content.encode())
+                    for day in completed_days:
+                        yield {'type': 'day', 'day': day}
+                    del completed_days[:]
+        
+        parser.close()
+        
+        yield {
+            'type': 'done',
+            plan_key: orjson.loads(''.join(parts)),
+            'model': model,
+            'tokens_used': tokens_used
+        }
     
     async def quick_query(
         self,
@@ -199,9 +581,16 @@ class GenAIService:
             Dictionary with response
         """
         try:
+            context = self._quick_query_context(user_context)
+            cache_key = make_cache_key('quick_query', normalize_text(query), context)
+            
+            cached, embedding = await self._cache_get(cache_key, query, context)
+            if cached is not None:
+                return cached
+            
             system_prompt = self.prompts.get_quick_query_prompt(user_context)
             
-            response = await self.client.chat.completions.create(
+            response = await self._create(
                 model=self.fallback_model,  # Use faster model for quick queries
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -211,15 +600,65 @@ class GenAIService:
                 max_tokens=500
             )
             
-            return {
+            result = {
                 'response': response.choices[0].message.content,
                 'model': response.model
             }
             
+            await self._cache_set(cache_key, result, context, embedding)
+            return result
+            
         except Exception as e:
             logger.error(f"Quick query error: {e}")
             raise
     
+    async def stream_quick_query(
+        self,
+        query: str,
+        user_context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the answer to a quick one-off query.
+        
+        Args:
+            query: User's question
+            user_context: Optional user context for personalization
+            
+        Yields:
+            Delta events with content, then a final event with the full
+            response and metadata
+        """
+        context = self._quick_query_context(user_context)
+        cache_key = make_cache_key('quick_query', normalize_text(query), context)
+        
+        cached, embedding = await self._cache_get(cache_key, query, context)
+        if cached is not None:
+            yield {'type': 'delta', 'content': cached['response']}
+            yield {'type': 'done', 'tokens_used': 0, **cached}
+            return
+        
+        system_prompt = self.prompts.get_quick_query_prompt(user_context)
+        
+        try:
+            stream = await self._create_stream(
+                model=self.fallback_model,  # Use faster model for quick queries
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": query}
+                ],
+                temperature=0.5,
+                max_tokens=500
+            )
+        except Exception as e:
+            logger.error(f"Quick query error: {e}")
+            raise
+        
+        async for event in self._iter_stream(stream):
+            if event['type'] == 'done':
+                result = {'response': event['response'], 'model': event['model']}
+                await self._cache_set(cache_key, result, context, embedding)
+            yield event
+    
     async def quick_meal_suggestion(
         self,
         meal_type: str,
@@ -242,29 +681,158 @@ class GenAIService:
             Dictionary with meal suggestions
         """
         try:
-            prompt = self.prompts.get_quick_meal_prompt(
-                meal_type, max_calories, diet_type,
-                exclude_ingredients, allergies
-            )
-            
-            response = await self.client.chat.completions.create(
-                model=self.fallback_model,
-                messages=[
-                    {"role": "system", "content": "You are a nutrition expert providing meal suggestions."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
+            cache_key = make_cache_key(
+                'quick_meal',
+                meal_type,
+                max_calories,
+                normalize_text(diet_type),
+                normalize_list(exclude_ingredients),
+                normalize_list(allergies)
             )
             
-            suggestions = json.loads(response.choices[0].message.content)
+            async def generate() -> Dict[str, Any]:
+                prompt = self.prompts.get_quick_meal_prompt(
+                    meal_type, max_calories, diet_type,
+                    exclude_ingredients, allergies
+                )
+                
+                response = await self._create(
+                    model=self.fallback_model,
+                    messages=[
+                        {"role": "system", "content": "You are a nutrition expert providing meal suggestions."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8,
+                    max_tokens=1000,
+                    response_format={"type": "json_object"}
+                )
+                
+                suggestions = orjson.loads(response.choices[0].message.content)
+                
+                return {
+                    'suggestions': suggestions.get('meals', []),
+                    'model': response.model
+                }
             
-            return {
-                'suggestions': suggestions.get('meals', []),
-                'model': response.model
-            }
+            return await self._single_flight(cache_key, generate)
             
         except Exception as e:
             logger.error(f"Quick meal suggestion error: {e}")
             raise
+    
+    # ===========================================
+    # Response Caching
+    # ===========================================
+    
+    @staticmethod
+    def _quick_query_context(user_context: Optional[Dict[str, Any]]) -> Tuple:
+        """The slice of user context that affects quick-query answers."""
+        if not user_context:
+            return ()
+        
+        diet = user_context.get('dietaryPreferences', {})
+        goals = user_context.get('fitnessGoals', {})
+        
+        return (
+            normalize_text(diet.get('dietType', 'omnivore')),
+            normalize_list(diet.get('allergies', [])),
+            normalize_text(goals.get('primaryGoal', 'general_fitness'))
+        )
+    
+    async def _cache_get(
+        self,
+        key: str,
+        text: Optional[str] = None,
+        context: Tuple = ()
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """
+        Look up a cached response, falling back to the semantic tier for text.
+        
+        Returns:
+            The cached response (or None) and the query embedding computed for
+            the semantic lookup, so a later store doesn't embed twice
+        """
+        if self.cache is None:
+            return None, None
+        
+        cached = await self.cache.get(key)
+        if cached is not None or self.semantic_index is None or text is None:
+            return cached, None
+        
+        embedding = await self._embed(text)
+        if embedding is None:
+            return None, None
+        
+        similar_key = self.semantic_index.lookup(make_cache_key('scope', context), embedding)
+        if similar_key is not None:
+            cached = await self.cache.get(similar_key)
+        
+        return cached, embedding
+    
+    async def _cache_set(
+        self,
+        key: str,
+        value: Dict[str, Any],
+        context: Tuple = (),
+        embedding: Optional[List[float]] = None
+    ):
+        """Store a response and index its embedding for semantic lookups."""
+        if self.cache is None:
+            return
+        
+        await self.cache.set(key, value)
+        
+        if embedding is not None and self.semantic_index is not None:
+            self.semantic_index.add(make_cache_key('scope', context), embedding, key)
+    
+    async def _single_flight(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[Dict[str, Any]]],
+        cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Serve a response from the cache, or generate it once for all
+        concurrent callers with the same key.
+        
+        The generation runs as its own task and every caller awaits it
+        through a shield, so one client disconnecting doesn't cancel the
+        call the others are waiting on. The result populates the cache
+        for later requests; with cache=False only the in-flight call is
+        shared and nothing is stored.
+        """
+        if cache:
+            cached, _ = await self._cache_get(key)
+            if cached is not None:
+                return cached
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._generate_and_cache(key, generate) if cache else generate()
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        return await asyncio.shield(task)
+    
+    async def _generate_and_cache(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        result = await generate()
+        await self._cache_set(key, result)
+        return result
+    
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed a query for the semantic cache; failures just skip the tier."""
+        try:
+            response = await self.client.embeddings.create(
+                model=settings.EMBEDDING_MODEL,
+                input=normalize_text(text)
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning(f"Query embedding failed: {e}")
+            return None
@@ -6,9 +6,15 @@ for food recognition and portion estimation.
 """
 
 import os
+import sys
+import asyncio
+import hashlib
+import importlib
 import logging
-from typing import Optional, Dict, Any
-import torch
+import threading
+from contextlib import contextmanager
+from functools import cached_property
+from typing import Callable, Dict, Any, Iterable, Optional, Set
 from pathlib import Path
 
 from app.config import settings
@@ -16,6 +22,31 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 
+# Directory torch.hub checks out intel-isl/MiDaS into
+MIDAS_HUB_REPO_DIR = "intel-isl_MiDaS_master"
+
+# MiDaS architectures built straight from the vendored source: module,
+# class and constructor arguments as in the repo's hubconf. Passing the
+# local checkpoint as `path` also stops them fetching backbone weights
+MIDAS_ARCHITECTURES = {
+    "MiDaS_small": ("midas.midas_net_custom", "MidasNet_small", {
+        "features": 64,
+        "backbone": "efficientnet_lite3",
+        "exportable": True,
+        "non_negative": True,
+        "blocks": {"expand": True}
+    }),
+    "DPT_Large": ("midas.dpt_depth", "DPTDepthModel", {
+        "backbone": "vitl16_384",
+        "non_negative": True
+    }),
+    "DPT_Hybrid": ("midas.dpt_depth", "DPTDepthModel", {
+        "backbone": "vitb_rn50_384",
+        "non_negative": True
+    }),
+}
+
+
 class ModelLoader:
     """
     Manages loading and unloading of ML models.
@@ -24,15 +55,33 @@ class ModelLoader:
     
     def __init__(self):
         self.models: Dict[str, Any] = {}
-        self.device = self._get_device()
         self.model_cache_dir = Path(settings.MODEL_CACHE_DIR)
         self.model_cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Models load on first use; the lock stops concurrent first
+        # requests from loading the same model twice
+        self._loaders: Dict[str, Callable[[], None]] = {
+            'food_recognition': self._load_food_recognition_model,
+            'depth_estimation': self._load_depth_estimation_model,
+        }
+        self._load_locks = {name: asyncio.Lock() for name in self._loaders}
+        self._warm_tasks: Set[asyncio.Task] = set()
     
-    def _get_device(self) -> str:
-        """Determine the best available device for model inference."""
+    @cached_property
+    def device(self) -> str:
+        """
+        Best available device for model inference.
+        
+        Resolved on first access, so torch is only imported once a model
+        is actually needed. Only probes availability: anything that creates
+        a CUDA context (e.g. get_device_name) would break forked workers
+        when this runs in the gunicorn master.
+        """
+        import torch
+        
         if torch.cuda.is_available():
             device = "cuda"
-            logger.info(f"Using CUDA device: {torch.cuda.get_device_name(0)}")
+            logger.info(f"Using CUDA ({torch.cuda.device_count()} device(s))")
         elif torch.backends.mps.is_available():
             device = "mps"
             logger.info("Using Apple MPS device")
@@ -43,11 +92,50 @@ class ModelLoader:
     
     async def load_models(self):
         """Load all required models."""
-        await self._load_food_recognition_model()
-        await self._load_depth_estimation_model()
+        for name in self._loaders:
+            await self.get_model(name)
         logger.info("All models loaded successfully")
     
-    async def _load_food_recognition_model(self):
+    def preload_models(self):
+        """
+        Load models synchronously in the current process.
+        
+        Meant for the gunicorn master before workers fork. The MiDaS and
+        PyTorch YOLO weights are then shared copy-on-write. The ONNX YOLO
+        backend only gets its one-off export and quantization done here:
+        ultralytics builds the ONNX Runtime session on the first predict,
+        so each worker creates its own session (with its own thread pool,
+        which would not survive a fork anyway) from the shared file.
+        
+        Only done on CPU: CUDA state does not survive a fork, so GPU
+        workers load their models after forking. The device is probed
+        through NVML here, which never initializes CUDA in this process.
+        """
+        os.environ.setdefault("PYTORCH_NVML_BASED_CUDA_CHECK", "1")
+        
+        if self.device != "cpu":
+            logger.info(f"Skipping model preload on {self.device}; workers load models")
+            return
+        
+        for name, loader in self._loaders.items():
+            if name not in self.models:
+                loader()
+        logger.info("Models preloaded before worker fork")
+    
+    def warm_models(self, names: Iterable[str]):
+        """Start loading models in the background without blocking startup."""
+        for name in names:
+            task = asyncio.create_task(self._warm_model(name))
+            self._warm_tasks.add(task)
+            task.add_done_callback(self._warm_tasks.discard)
+    
+    async def _warm_model(self, name: str):
+        try:
+            await self.get_model(name)
+        except Exception as e:
+            logger.warning(f"Failed to prewarm model {name}: {e}")
+    
+    def _load_food_recognition_model(self):
         """Load YOLOv8 model for food recognition."""
         try:
             from ultralytics import YOLO
@@ -62,8 +150,14 @@ class ModelLoader:
             else:
                 model = YOLO(str(model_path))
             
-            # Move to appropriate device
-            model.to(self.device)
+            backend = settings.FOOD_RECOGNITION_BACKEND
+            if backend == "onnx" and self.device == "cpu":
+                model = self._load_onnx_food_recognition_model(model)
+            elif backend == "tensorrt" and self.device == "cuda":
+                model = self._load_tensorrt_food_recognition_model(model)
+            else:
+                # Move to appropriate device
+                model.to(self.device)
             
             self.models['food_recognition'] = model
             logger.info(f"Food recognition model loaded: {settings.FOOD_RECOGNITION_MODEL}")
@@ -72,37 +166,125 @@ class ModelLoader:
             logger.error(f"Failed to load food recognition model: {e}")
             raise
     
-    async def _load_depth_estimation_model(self):
+    def _load_onnx_food_recognition_model(self, model):
+        """
+        Swap the PyTorch YOLO model for an INT8 ONNX Runtime export on CPU.
+        
+        The quantized export is cached in the model cache directory, so the
+        conversion only happens once. The returned YOLO wrapper keeps the
+        same call interface. Falls back to the PyTorch model on failure.
+        """
+        from ultralytics import YOLO
+        
+        stem = Path(settings.FOOD_RECOGNITION_MODEL).stem
+        int8_path = self.model_cache_dir / f"{stem}_int8.onnx"
+        
+        try:
+            if not int8_path.exists():
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                
+                logger.info(f"Exporting food recognition model to ONNX: {stem}")
+                onnx_path = model.export(format="onnx", dynamic=True)
+                quantize_dynamic(
+                    str(onnx_path),
+                    str(int8_path),
+                    weight_type=QuantType.QUInt8
+                )
+            
+            return YOLO(str(int8_path), task="detect")
+            
+        except Exception as e:
+            logger.warning(f"ONNX backend unavailable, using PyTorch: {e}")
+            return model
+    
+    def _load_tensorrt_food_recognition_model(self, model):
+        """
+        Swap the PyTorch YOLO model for an FP16 TensorRT engine on CUDA.
+        
+        The engine is built for the configured input size and batch size
+        and cached in the model cache directory, so the (slow) build only
+        happens once per GPU. Falls back to the PyTorch model on failure.
+        """
+        from ultralytics import YOLO
+        
+        stem = Path(settings.FOOD_RECOGNITION_MODEL).stem
+        engine_path = self.model_cache_dir / f"{stem}_fp16.engine"
+        
+        try:
+            if not engine_path.exists():
+                logger.info(f"Building TensorRT engine for food recognition model: {stem}")
+                exported = model.export(
+                    format="engine",
+                    half=True,
+                    dynamic=True,
+                    batch=settings.BATCH_MAX_SIZE,
+                    imgsz=settings.FOOD_RECOGNITION_IMAGE_SIZE
+                )
+                Path(exported).replace(engine_path)
+            
+            return YOLO(str(engine_path), task="detect")
+            
+        except Exception as e:
+            logger.warning(f"TensorRT backend unavailable, using PyTorch: {e}")
+            model.to(self.device)
+            return model
+    
+    def _load_depth_estimation_model(self):
         """Load MiDaS model for depth estimation (used in portion sizing)."""
+        import torch
+        
         try:
             # MiDaS model for depth estimation
             model_type = settings.DEPTH_ESTIMATION_MODEL
+            checkpoint_path = self.model_cache_dir / f"midas_{model_type}.pt"
+            
+            if checkpoint_path.exists():
+                # Build the architecture from local source and load the
+                # pinned, hash-checked weights; no hub or network access
+                self._verify_checkpoint(checkpoint_path)
+                midas = self._build_midas(model_type, checkpoint_path)
+            else:
+                midas = self._load_midas_hub(model_type)
+                torch.save(midas.state_dict(), checkpoint_path)
+                self._checkpoint_digest_path(checkpoint_path).write_text(
+                    self._file_sha256(checkpoint_path)
+                )
+                logger.info(f"Saved depth estimation checkpoint: {checkpoint_path}")
             
-            midas = torch.hub.load(
-                "intel-isl/MiDaS",
-                model_type,
-                trust_repo=True
-            )
             midas.to(self.device)
             midas.eval()
             
+            # Half precision on GPU halves weight and activation bandwidth
+            if self.device in ("cuda", "mps"):
+                midas.half()
+            
+            # Fuse kernels with Inductor; crops vary in aspect ratio, so
+            # compile for dynamic shapes rather than one graph per shape
+            compiled = settings.DEPTH_MODEL_COMPILE and self.device == "cuda"
+            if compiled:
+                midas = torch.compile(midas, dynamic=True)
+            
             # Load transforms
-            midas_transforms = torch.hub.load(
-                "intel-isl/MiDaS",
-                "transforms",
-                trust_repo=True
-            )
+            midas_transforms = self._load_midas_hub("transforms")
             
+            # Square input each transform passes through at its native size
             if "DPT" in model_type:
                 transform = midas_transforms.dpt_transform
+                graph_input_size = 384
             else:
                 transform = midas_transforms.small_transform
+                graph_input_size = 256
             
-            self.models['depth_estimation'] = {
+            depth_model = {
                 'model': midas,
                 'transform': transform
             }
             
+            if settings.DEPTH_MODEL_CUDA_GRAPH and self.device == "cuda" and not compiled:
+                depth_model.update(self._capture_depth_graph(midas, graph_input_size))
+            
+            self.models['depth_estimation'] = depth_model
+            
             logger.info(f"Depth estimation model loaded: {model_type}")
             
         except Exception as e:
@@ -110,12 +292,169 @@ class ModelLoader:
             # Non-critical, continue without depth estimation
             self.models['depth_estimation'] = None
     
-    def get_model(self, model_name: str) -> Optional[Any]:
-        """Get a loaded model by name."""
+    def _capture_depth_graph(self, midas, size: int) -> Dict[str, Any]:
+        """
+        Capture the MiDaS forward for a fixed (1, 3, size, size) input as
+        a CUDA graph, so inference replays it with a single launch.
+        
+        Returns the graph, its static input/output tensors and a lock that
+        serializes replays (the static tensors are shared), or an empty
+        dict if capture fails and the eager model should be used.
+        """
+        import torch
+        
+        try:
+            param = next(midas.parameters())
+            static_input = torch.zeros(
+                (1, 3, size, size), device=self.device, dtype=param.dtype
+            )
+            
+            with torch.inference_mode():
+                # Warm up on a side stream so lazy allocations and kernel
+                # selection happen before capture
+                stream = torch.cuda.Stream()
+                stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(stream):
+                    for _ in range(3):
+                        midas(static_input)
+                torch.cuda.current_stream().wait_stream(stream)
+                
+                graph = torch.cuda.CUDAGraph()
+                with torch.cuda.graph(graph):
+                    static_output = midas(static_input)
+            
+            logger.info(f"Captured depth estimation CUDA graph at {size}x{size}")
+            return {
+                'graph': graph,
+                'graph_lock': threading.Lock(),
+                'input_size': size,
+                'static_input': static_input,
+                'static_output': static_output
+            }
+            
+        except Exception as e:
+            logger.warning(f"CUDA graph capture failed, using eager depth model: {e}")
+            return {}
+    
+    def _build_midas(self, model_type: str, checkpoint_path: Path) -> Any:
+        """
+        Construct a MiDaS model from the vendored hub checkout with the
+        weights from `checkpoint_path`.
+        
+        Model types without a recipe in MIDAS_ARCHITECTURES (or without a
+        local checkout) are built through the hub entrypoint instead.
+        """
+        import torch
+        
+        local_repo = Path(torch.hub.get_dir()) / MIDAS_HUB_REPO_DIR
+        architecture = MIDAS_ARCHITECTURES.get(model_type)
+        
+        if architecture is None or not local_repo.exists():
+            midas = self._load_midas_hub(model_type, pretrained=False)
+            midas.load_state_dict(
+                torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+            )
+            return midas
+        
+        module_name, class_name, kwargs = architecture
+        sys.path.insert(0, str(local_repo))
+        try:
+            with self._offline_hub():
+                model_class = getattr(importlib.import_module(module_name), class_name)
+                return model_class(path=str(checkpoint_path), **kwargs)
+        finally:
+            sys.path.remove(str(local_repo))
+    
+    @staticmethod
+    @contextmanager
+    def _offline_hub():
+        """
+        Resolve torch.hub GitHub loads made by the MiDaS source (the
+        efficientnet backbone code) to existing local hub checkouts.
+        """
+        import torch
+        
+        hub_load = torch.hub.load
+        hub_dir = Path(torch.hub.get_dir())
+        
+        def load(repo_or_dir, model, *args, source="github", **kwargs):
+            if source == "github":
+                owner_repo = repo_or_dir.split(":")[0].replace("/", "_")
+                checkouts = sorted(hub_dir.glob(f"{owner_repo}_*"))
+                if checkouts:
+                    kwargs.pop("trust_repo", None)
+                    return hub_load(str(checkouts[0]), model, *args, source="local", **kwargs)
+            return hub_load(repo_or_dir, model, *args, source=source, **kwargs)
+        
+        torch.hub.load = load
+        try:
+            yield
+        finally:
+            torch.hub.load = hub_load
+    
+    def _verify_checkpoint(self, checkpoint_path: Path):
+        """
+        Check the checkpoint against DEPTH_MODEL_SHA256, or the digest
+        recorded when it was saved.
+        
+        Raises:
+            ValueError: If no digest is known or the file doesn't match
+        """
+        digest_path = self._checkpoint_digest_path(checkpoint_path)
+        expected = settings.DEPTH_MODEL_SHA256 or (
+            digest_path.read_text().strip() if digest_path.exists() else ""
+        )
+        if not expected:
+            raise ValueError(f"No SHA-256 pinned for {checkpoint_path.name}")
+        
+        actual = self._file_sha256(checkpoint_path)
+        if actual != expected.lower():
+            raise ValueError(
+                f"Checksum mismatch for {checkpoint_path.name}: expected {expected}, got {actual}"
+            )
+    
+    @staticmethod
+    def _checkpoint_digest_path(checkpoint_path: Path) -> Path:
+        return checkpoint_path.with_name(f"{checkpoint_path.name}.sha256")
+    
+    @staticmethod
+    def _file_sha256(path: Path) -> str:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    
+    def _load_midas_hub(self, entrypoint: str, **kwargs) -> Any:
+        """
+        Load a MiDaS hub entrypoint, from the local hub checkout when one
+        exists so startup skips the GitHub round trip.
+        """
+        import torch
+        
+        local_repo = Path(torch.hub.get_dir()) / MIDAS_HUB_REPO_DIR
+        
+        if local_repo.exists():
+            return torch.hub.load(str(local_repo), entrypoint, source="local", **kwargs)
+        
+        return torch.hub.load("intel-isl/MiDaS", entrypoint, trust_repo=True, **kwargs)
+    
+    async def get_model(self, model_name: str) -> Optional[Any]:
+        """
+        Get a model by name, loading it on first use.
+        
+        Loading runs in a worker thread so the event loop keeps serving
+        other requests while weights are downloaded and initialized.
+        """
+        if model_name not in self.models and model_name in self._loaders:
+            async with self._load_locks[model_name]:
+                if model_name not in self.models:
+                    await asyncio.to_thread(self._loaders[model_name])
+        
         return self.models.get(model_name)
     
     async def unload_models(self):
         """Unload all models and free memory."""
+        for task in list(self._warm_tasks):
+            task.cancel()
+        
         for name, model in self.models.items():
             if model is not None:
                 del model
@@ -123,8 +462,8 @@ class ModelLoader:
         
         self.models.clear()
         
-        # Clear GPU cache if using CUDA
-        if self.device == "cuda":
-            torch.cuda.empty_cache()
+        # Clear GPU cache if using CUDA (nothing to clear if torch never loaded)
+        if "torch" in sys.modules and self.device == "cuda":
+            sys.modules["torch"].cuda.empty_cache()
         
         logger.info("All models unloaded")
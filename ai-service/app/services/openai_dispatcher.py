@@ -0,0 +1,176 @@
+"""
+OpenAI Request Dispatcher
+
+Schedules chat completion calls through a shared queue with:
+- A fixed pool of concurrent workers
+- Request and token budgets per minute (token buckets)
+- A cooldown after rate-limit responses
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from openai import RateLimitError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Pause applied to all workers after a 429 from the API
+RATE_LIMIT_COOLDOWN_SECONDS = 15
+
+# Rough characters-per-token ratio used to budget prompt tokens
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """Continuously refilling budget of `capacity` units per minute."""
+    
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.available = capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(
+            self.capacity,
+            self.available + (now - self.updated_at) * self.capacity / 60
+        )
+        self.updated_at = now
+    
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.capacity
+    
+    def consume(self, amount: float):
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+
+class OpenAIDispatcher:
+    """
+    Runs API calls submitted from any request through a shared worker pool.
+    
+    Workers only start a call once both the request and token budgets
+    allow it, so bursts queue up instead of triggering 429s.
+    """
+    
+    def __init__(self):
+        self.num_workers = settings.OPENAI_MAX_CONCURRENCY
+        
+        # The budgets are per API key; split them across server processes
+        processes = max(1, settings.WORKERS)
+        self._requests = TokenBucket(settings.OPENAI_MAX_REQUESTS_PER_MINUTE / processes)
+        self._tokens = TokenBucket(settings.OPENAI_MAX_TOKENS_PER_MINUTE / processes)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._budget_lock = asyncio.Lock()
+        self._cooldown_until = 0.0
+        self._workers: List[asyncio.Task] = []
+    
+    def start(self):
+        """Start the worker coroutines."""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.num_workers)
+            ]
+            logger.info(f"OpenAI dispatcher started with {self.num_workers} workers")
+    
+    async def stop(self):
+        """Stop the workers and fail any calls still queued."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("OpenAI dispatcher shutting down"))
+    
+    async def submit(self, call: Callable[..., Awaitable[Any]], **params) -> Any:
+        """
+        Queue an API call and wait for its result.
+        
+        Args:
+            call: Coroutine function to invoke (e.g. client.chat.completions.create)
+            **params: Keyword arguments for the call
+        
+        Returns:
+            Whatever the call returns
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((call, params, future))
+        return await future
+    
+    @staticmethod
+    def _estimate_tokens(params: Dict[str, Any]) -> int:
+        """Estimate prompt plus completion tokens for budgeting."""
+        prompt_chars = sum(
+            len(message.get("content") or "")
+            for message in params.get("messages", [])
+        )
+        return prompt_chars // CHARS_PER_TOKEN + params.get("max_tokens", 0)
+    
+    async def _acquire(self, tokens: int):
+        """Wait until the cooldown has passed and both budgets allow the call."""
+        async with self._budget_lock:
+            while True:
+                wait = max(
+                    self._cooldown_until - time.monotonic(),
+                    self._requests.wait_time(1),
+                    self._tokens.wait_time(tokens)
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            
+            self._requests.consume(1)
+            self._tokens.consume(tokens)
+    
+    async def _worker(self):
+        while True:
+            call, params, future = await self._queue.get()
+            
+            if future.cancelled():
+                continue
+            
+            try:
+                await self._acquire(self._estimate_tokens(params))
+                result = await call(**params)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except RateLimitError as e:
+                logger.warning(
+                    f"OpenAI rate limit hit, pausing for {RATE_LIMIT_COOLDOWN_SECONDS}s"
+                )
+                self._cooldown_until = time.monotonic() + RATE_LIMIT_COOLDOWN_SECONDS
+                if not future.done():
+                    future.set_exception(e)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+                elif params.get("stream"):
+                    # The caller went away; close the stream so its HTTP
+                    # stream and pooled connection are released
+                    await self._close_stream(result)
+    
+    @staticmethod
+    async def _close_stream(stream: Any):
+        try:
+            await stream.close()
+        except Exception as e:
+            logger.warning(f"Failed to close abandoned OpenAI stream: {e}")
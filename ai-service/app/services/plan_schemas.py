@@ -0,0 +1,135 @@
+"""
+Plan Schemas
+
+Pydantic models describing the meal and workout plan JSON that the
+LLM is asked to produce. Used to build strict JSON Schemas for
+structured outputs, mirroring the structures in the system prompts.
+"""
+
+from typing import Any, Dict, List, Type
+from pydantic import BaseModel, ConfigDict
+
+
+# Structured outputs require every object to forbid extra keys
+SCHEMA_MODEL_CONFIG = ConfigDict(extra='forbid')
+
+
+# ===========================================
+# Meal Plan
+# ===========================================
+
+class Nutrition(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+
+
+class Meal(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    name: str
+    description: str
+    ingredients: List[str]
+    nutrition: Nutrition
+    prepTime: str
+
+
+class DayMeals(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    breakfast: Meal
+    lunch: Meal
+    dinner: Meal
+    snacks: List[Meal]
+
+
+class MealPlanDay(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    day: int
+    dayName: str
+    meals: DayMeals
+    dailyTotals: Nutrition
+
+
+class MealPlan(BaseModel):
+    """A multi-day meal plan with grocery list and tips."""
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    days: List[MealPlanDay]
+    weeklyAverage: Nutrition
+    groceryList: List[str]
+    tips: List[str]
+
+
+# ===========================================
+# Workout Plan
+# ===========================================
+
+class TimedExercise(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    exercise: str
+    duration: str
+
+
+class Exercise(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    name: str
+    sets: int
+    reps: str
+    rest: str
+    instructions: str
+    muscleGroups: List[str]
+
+
+class WorkoutDay(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    day: int
+    dayName: str
+    focus: str
+    duration: int
+    warmup: List[TimedExercise]
+    exercises: List[Exercise]
+    cooldown: List[TimedExercise]
+    estimatedCaloriesBurn: int
+
+
+class WeeklyOverview(BaseModel):
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    totalWorkouts: int
+    restDays: int
+    focusAreas: List[str]
+    estimatedWeeklyCaloriesBurn: int
+
+
+class WorkoutPlan(BaseModel):
+    """A multi-day workout plan with progression tips."""
+    model_config = SCHEMA_MODEL_CONFIG
+    
+    days: List[WorkoutDay]
+    weeklyOverview: WeeklyOverview
+    progressionTips: List[str]
+    equipmentNeeded: List[str]
+
+
+def json_schema_response_format(name: str, model: Type[BaseModel]) -> Dict[str, Any]:
+    """Build a strict structured-output response_format for a plan model."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "schema": model.model_json_schema(),
+            "strict": True
+        }
+    }
+
+
+MEAL_PLAN_RESPONSE_FORMAT = json_schema_response_format("meal_plan", MealPlan)
+WORKOUT_PLAN_RESPONSE_FORMAT = json_schema_response_format("workout_plan", WorkoutPlan)
@@ -8,36 +8,15 @@ Contains all prompt templates used for:
 - Quick queries
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Final, List, Optional
+import jinja2
 
 
-class PromptTemplates:
-    """Manages prompt templates for GenAI interactions."""
-    
-    def get_chat_system_prompt(self, user_context: Dict[str, Any]) -> str:
-        """Generate system prompt for chat with user context."""
-        
-        # Extract user info
-        profile = user_context.get('profile', {})
-        goals = user_context.get('fitnessGoals', {})
-        diet = user_context.get('dietaryPreferences', {})
-        metrics = user_context.get('calculatedMetrics', {})
-        
-        return f"""You are NutriVision AI, an expert nutrition and fitness assistant. You provide personalized advice based on the user's profile and goals.
-
-## User Profile
-- Name: {profile.get('firstName', 'User')}
-- Gender: {profile.get('gender', 'not specified')}
-- Primary Goal: {goals.get('primaryGoal', 'general fitness')}
-- Activity Level: {goals.get('activityLevel', 'moderate')}
-- Diet Type: {diet.get('dietType', 'omnivore')}
-- Allergies: {', '.join(diet.get('allergies', [])) or 'None'}
+# Static prompt text, built once at import and shared by every request.
+# Keeping it byte-identical across processes keeps provider prompt
+# cache prefixes stable.
 
-## Daily Targets
-- Calories: {metrics.get('dailyCalorieTarget', 'Not calculated')} kcal
-- Protein: {metrics.get('macroTargets', {}).get('protein', 'N/A')}g
-- Carbs: {metrics.get('macroTargets', {}).get('carbs', 'N/A')}g
-- Fat: {metrics.get('macroTargets', {}).get('fat', 'N/A')}g
+CHAT_SYSTEM_PROMPT_PREFIX: Final[str] = """You are NutriVision AI, an expert nutrition and fitness assistant. You provide personalized advice based on the user's profile and goals.
 
 ## Guidelines
 1. Always consider the user's dietary restrictions and allergies
@@ -53,12 +32,27 @@ class PromptTemplates:
 - Friendly and supportive tone
 - Use bullet points for lists
 - Include emojis sparingly for engagement
-- Provide reasoning for recommendations"""
+- Provide reasoning for recommendations
 
-    def get_meal_plan_system_prompt(self) -> str:
-        """System prompt for meal plan generation."""
-        
-        return """You are an expert nutritionist creating personalized meal plans. Generate detailed, practical meal plans that:
+---
+
+"""
+
+QUICK_QUERY_PROMPT_PREFIX: Final[str] = """You are NutriVision AI, a helpful nutrition and fitness assistant. Provide concise, accurate answers to questions about:
+- Food nutrition
+- Calories and macros
+- Meal suggestions
+- Exercise tips
+- Healthy eating habits
+
+Guidelines:
+- Keep responses brief and to the point
+- Include specific numbers when relevant (calories, grams, etc.)
+- Recommend consulting healthcare professionals for medical advice
+- Be encouraging and supportive
+"""
+
+MEAL_PLAN_SYSTEM_PROMPT: Final[str] = """You are an expert nutritionist creating personalized meal plans. Generate detailed, practical meal plans that:
 
 1. Meet the user's calorie and macro targets
 2. Respect dietary preferences and restrictions
@@ -108,55 +102,7 @@ Output your response as a valid JSON object with the following structure:
   "tips": ["tip 1", "tip 2"]
 }"""
 
-    def get_meal_plan_user_prompt(
-        self,
-        user_context: Dict[str, Any],
-        days: int,
-        include_snacks: bool
-    ) -> str:
-        """Generate user prompt for meal plan request."""
-        
-        goals = user_context.get('fitnessGoals', {})
-        diet = user_context.get('dietaryPreferences', {})
-        metrics = user_context.get('calculatedMetrics', {})
-        physical = user_context.get('physicalAttributes', {})
-        
-        return f"""Create a {days}-day personalized meal plan with the following requirements:
-
-## User Stats
-- Age: {physical.get('age', 'Unknown')}
-- Weight: {physical.get('weight', 'Unknown')} kg
-- Height: {physical.get('height', 'Unknown')} cm
-
-## Goals
-- Primary Goal: {goals.get('primaryGoal', 'general_fitness')}
-- Target Weight: {goals.get('targetWeight', 'Not set')} kg
-- Activity Level: {goals.get('activityLevel', 'moderately_active')}
-
-## Daily Targets
-- Calories: {metrics.get('dailyCalorieTarget', 2000)} kcal
-- Protein: {metrics.get('macroTargets', {}).get('protein', 150)}g
-- Carbs: {metrics.get('macroTargets', {}).get('carbs', 200)}g
-- Fat: {metrics.get('macroTargets', {}).get('fat', 70)}g
-
-## Dietary Preferences
-- Diet Type: {diet.get('dietType', 'omnivore')}
-- Allergies: {', '.join(diet.get('allergies', [])) or 'None'}
-- Foods to Avoid: {', '.join(diet.get('dislikedFoods', [])) or 'None'}
-- Preferred Cuisines: {', '.join(diet.get('preferredCuisines', [])) or 'Any'}
-
-## Additional Requirements
-- Include snacks: {'Yes' if include_snacks else 'No'}
-- Meals should be practical and easy to prepare
-- Include variety throughout the week
-- Consider meal prep opportunities
-
-Generate a complete {days}-day meal plan as JSON."""
-
-    def get_workout_plan_system_prompt(self) -> str:
-        """System prompt for workout plan generation."""
-        
-        return """You are an expert fitness coach creating personalized workout plans. Generate detailed, safe, and effective workout plans that:
+WORKOUT_PLAN_SYSTEM_PROMPT: Final[str] = """You are an expert fitness coach creating personalized workout plans. Generate detailed, safe, and effective workout plans that:
 
 1. Match the user's fitness level and goals
 2. Include proper warm-up and cool-down
@@ -208,43 +154,185 @@ Output your response as a valid JSON object with the following structure:
   "equipmentNeeded": ["dumbbells", "resistance bands"]
 }"""
 
-    def get_workout_plan_user_prompt(
-        self,
-        user_context: Dict[str, Any],
-        days: int,
-        preferences: Optional[Dict[str, Any]] = None
-    ) -> str:
-        """Generate user prompt for workout plan request."""
-        
-        goals = user_context.get('fitnessGoals', {})
-        physical = user_context.get('physicalAttributes', {})
-        preferences = preferences or {}
-        
-        return f"""Create a {days}-day personalized workout plan with the following requirements:
+
+# User prompt templates, compiled once per PromptTemplates instance.
+# Missing context fields fall back to the `default` filter values.
+
+MEAL_PLAN_USER_TEMPLATE: Final[str] = """Create a {{ days }}-day personalized meal plan with the following requirements:
+
+## User Stats
+- Age: {{ physical.age | default('Unknown') }}
+- Weight: {{ physical.weight | default('Unknown') }} kg
+- Height: {{ physical.height | default('Unknown') }} cm
+
+## Goals
+- Primary Goal: {{ goals.primaryGoal | default('general_fitness') }}
+- Target Weight: {{ goals.targetWeight | default('Not set') }} kg
+- Activity Level: {{ goals.activityLevel | default('moderately_active') }}
+
+## Daily Targets
+- Calories: {{ metrics.dailyCalorieTarget | default(2000) }} kcal
+- Protein: {{ metrics.macroTargets.protein | default(150) }}g
+- Carbs: {{ metrics.macroTargets.carbs | default(200) }}g
+- Fat: {{ metrics.macroTargets.fat | default(70) }}g
+
+## Dietary Preferences
+- Diet Type: {{ diet.dietType | default('omnivore') }}
+- Allergies: {{ diet.allergies | sort | join(', ') or 'None' }}
+- Foods to Avoid: {{ diet.dislikedFoods | sort | join(', ') or 'None' }}
+- Preferred Cuisines: {{ diet.preferredCuisines | join(', ') or 'Any' }}
+
+## Additional Requirements
+- Include snacks: {{ 'Yes' if include_snacks else 'No' }}
+- Meals should be practical and easy to prepare
+- Include variety throughout the week
+- Consider meal prep opportunities
+
+Generate a complete {{ days }}-day meal plan as JSON."""
+
+WORKOUT_PLAN_USER_TEMPLATE: Final[str] = """Create a {{ days }}-day personalized workout plan with the following requirements:
 
 ## User Stats
-- Age: {physical.get('age', 'Unknown')}
-- Weight: {physical.get('weight', 'Unknown')} kg
-- Height: {physical.get('height', 'Unknown')} cm
+- Age: {{ physical.age | default('Unknown') }}
+- Weight: {{ physical.weight | default('Unknown') }} kg
+- Height: {{ physical.height | default('Unknown') }} cm
 
 ## Fitness Goals
-- Primary Goal: {goals.get('primaryGoal', 'general_fitness')}
-- Activity Level: {goals.get('activityLevel', 'moderately_active')}
+- Primary Goal: {{ goals.primaryGoal | default('general_fitness') }}
+- Activity Level: {{ goals.activityLevel | default('moderately_active') }}
 
 ## Preferences
-- Difficulty: {preferences.get('difficulty', 'intermediate')}
-- Include Rest Days: {preferences.get('includeRestDays', True)}
-- Max Duration per Session: {preferences.get('maxDuration', 60)} minutes
-- Available Equipment: {', '.join(preferences.get('availableEquipment', [])) or 'Basic (bodyweight, dumbbells)'}
+- Difficulty: {{ preferences.difficulty | default('intermediate') }}
+- Include Rest Days: {{ preferences.includeRestDays | default(True) }}
+- Max Duration per Session: {{ preferences.maxDuration | default(60) }} minutes
+- Available Equipment: {{ preferences.availableEquipment | join(', ') or 'Basic (bodyweight, dumbbells)' }}
 
 ## Goal-Specific Focus
-{'- Focus on fat-burning exercises with high-intensity intervals' if goals.get('primaryGoal') == 'fat_loss' else ''}
-{'- Focus on progressive overload and muscle building' if goals.get('primaryGoal') == 'muscle_gain' else ''}
-{'- Focus on maintaining current fitness with balanced routine' if goals.get('primaryGoal') == 'maintenance' else ''}
-{'- Focus on cardio and stamina building' if goals.get('primaryGoal') == 'endurance' else ''}
+{% if goals.primaryGoal == 'fat_loss' %}
+- Focus on fat-burning exercises with high-intensity intervals
+{% elif goals.primaryGoal == 'muscle_gain' %}
+- Focus on progressive overload and muscle building
+{% elif goals.primaryGoal == 'maintenance' %}
+- Focus on maintaining current fitness with balanced routine
+{% elif goals.primaryGoal == 'endurance' %}
+- Focus on cardio and stamina building
+{% endif %}
 
-Generate a complete {days}-day workout plan as JSON."""
+Generate a complete {{ days }}-day workout plan as JSON."""
 
+QUICK_MEAL_TEMPLATE: Final[str] = """Suggest 3 {{ meal_type }} options that meet these criteria:
+
+- Maximum calories: {{ max_calories }} kcal
+- Diet type: {{ diet_type }}
+- Avoid these ingredients: {{ exclude_ingredients | join(', ') or 'None' }}
+- Allergies to avoid: {{ allergies | join(', ') or 'None' }}
+
+For each meal, include:
+1. Meal name
+2. Brief description
+3. Estimated calories
+4. Main ingredients
+5. Protein, carbs, and fat content
+
+Return as JSON:
+{
+  "meals": [
+    {
+      "name": "Meal name",
+      "description": "Brief description",
+      "calories": 400,
+      "protein": 25,
+      "carbs": 45,
+      "fat": 12,
+      "ingredients": ["ingredient 1", "ingredient 2"],
+      "prepTime": "15 mins"
+    }
+  ]
+}"""
+
+
+class PromptTemplates:
+    """Manages prompt templates for GenAI interactions."""
+    
+    def __init__(self):
+        env = jinja2.Environment(
+            autoescape=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            undefined=jinja2.ChainableUndefined
+        )
+        self._meal_user_tpl = env.from_string(MEAL_PLAN_USER_TEMPLATE)
+        self._workout_user_tpl = env.from_string(WORKOUT_PLAN_USER_TEMPLATE)
+        self._quick_meal_tpl = env.from_string(QUICK_MEAL_TEMPLATE)
+    
+    def get_chat_system_prompt(self, user_context: Dict[str, Any]) -> str:
+        """Generate system prompt for chat with user context."""
+        
+        # Extract user info
+        profile = user_context.get('profile', {})
+        goals = user_context.get('fitnessGoals', {})
+        diet = user_context.get('dietaryPreferences', {})
+        metrics = user_context.get('calculatedMetrics', {})
+        
+        # Static instructions first so the prompt prefix is shared across
+        # users (provider prompt caching); user-specific context goes last,
+        # with list values sorted so the same profile renders the same bytes
+        return CHAT_SYSTEM_PROMPT_PREFIX + f"""## User Profile
+- Name: {profile.get('firstName', 'User')}
+- Gender: {profile.get('gender', 'not specified')}
+- Primary Goal: {goals.get('primaryGoal', 'general fitness')}
+- Activity Level: {goals.get('activityLevel', 'moderate')}
+- Diet Type: {diet.get('dietType', 'omnivore')}
+- Allergies: {', '.join(sorted(diet.get('allergies', []))) or 'None'}
+
+## Daily Targets
+- Calories: {metrics.get('dailyCalorieTarget', 'Not calculated')} kcal
+- Protein: {metrics.get('macroTargets', {}).get('protein', 'N/A')}g
+- Carbs: {metrics.get('macroTargets', {}).get('carbs', 'N/A')}g
+- Fat: {metrics.get('macroTargets', {}).get('fat', 'N/A')}g"""
+
+    def get_meal_plan_system_prompt(self) -> str:
+        """System prompt for meal plan generation."""
+        
+        return MEAL_PLAN_SYSTEM_PROMPT
+    
+    def get_meal_plan_user_prompt(
+        self,
+        user_context: Dict[str, Any],
+        days: int,
+        include_snacks: bool
+    ) -> str:
+        """Generate user prompt for meal plan request."""
+        
+        return self._meal_user_tpl.render(
+            goals=user_context.get('fitnessGoals', {}),
+            diet=user_context.get('dietaryPreferences', {}),
+            metrics=user_context.get('calculatedMetrics', {}),
+            physical=user_context.get('physicalAttributes', {}),
+            days=days,
+            include_snacks=include_snacks
+        )
+    
+    def get_workout_plan_system_prompt(self) -> str:
+        """System prompt for workout plan generation."""
+        
+        return WORKOUT_PLAN_SYSTEM_PROMPT
+    
+    def get_workout_plan_user_prompt(
+        self,
+        user_context: Dict[str, Any],
+        days: int,
+        preferences: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Generate user prompt for workout plan request."""
+        
+        return self._workout_user_tpl.render(
+            goals=user_context.get('fitnessGoals', {}),
+            physical=user_context.get('physicalAttributes', {}),
+            preferences=preferences or {},
+            days=days
+        )
+    
     def get_quick_query_prompt(self, user_context: Optional[Dict[str, Any]] = None) -> str:
         """System prompt for quick one-off queries."""
         
@@ -255,25 +343,13 @@ Generate a complete {days}-day workout plan as JSON."""
             context_info = f"""
 User Context:
 - Diet Type: {diet.get('dietType', 'omnivore')}
-- Allergies: {', '.join(diet.get('allergies', [])) or 'None'}
+- Allergies: {', '.join(sorted(diet.get('allergies', []))) or 'None'}
 - Fitness Goal: {goals.get('primaryGoal', 'general_fitness')}
 """
-        
-        return f"""You are NutriVision AI, a helpful nutrition and fitness assistant. Provide concise, accurate answers to questions about:
-- Food nutrition
-- Calories and macros
-- Meal suggestions
-- Exercise tips
-- Healthy eating habits
-
-{context_info}
-
-Guidelines:
-- Keep responses brief and to the point
-- Include specific numbers when relevant (calories, grams, etc.)
-- Recommend consulting healthcare professionals for medical advice
-- Be encouraging and supportive"""
 
+        # Static instructions first, user context last (see get_chat_system_prompt)
+        return QUICK_QUERY_PROMPT_PREFIX + context_info
+    
     def get_quick_meal_prompt(
         self,
         meal_type: str,
@@ -284,32 +360,10 @@ Guidelines:
     ) -> str:
         """Prompt for quick meal suggestions."""
         
-        return f"""Suggest 3 {meal_type} options that meet these criteria:
-
-- Maximum calories: {max_calories} kcal
-- Diet type: {diet_type}
-- Avoid these ingredients: {', '.join(exclude_ingredients) or 'None'}
-- Allergies to avoid: {', '.join(allergies) or 'None'}
-
-For each meal, include:
-1. Meal name
-2. Brief description
-3. Estimated calories
-4. Main ingredients
-5. Protein, carbs, and fat content
-
-Return as JSON:
-{{
-  "meals": [
-    {{
-      "name": "Meal name",
-      "description": "Brief description",
-      "calories": 400,
-      "protein": 25,
-      "carbs": 45,
-      "fat": 12,
-      "ingredients": ["ingredient 1", "ingredient 2"],
-      "prepTime": "15 mins"
-    }}
-  ]
-}}"""
+        return self._quick_meal_tpl.render(
+            meal_type=meal_type,
+            max_calories=max_calories,
+            diet_type=diet_type,
+            exclude_ingredients=exclude_ingredients,
+            allergies=allergies
+        )
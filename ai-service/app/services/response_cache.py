@@ -0,0 +1,156 @@
+"""
+Response Cache Service
+
+Caches GenAI responses for repeated queries with:
+- An exact-match tier keyed on the normalized request
+- An optional semantic tier matching near-duplicate queries by embedding
+"""
+
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import orjson
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Bumped whenever prompts or response shapes change, orphaning old entries
+CACHE_VERSION = "v2"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivial variations share a key."""
+    return _WHITESPACE.sub(" ", text.strip().lower())
+
+
+def normalize_list(values: Optional[List[str]]) -> List[str]:
+    """Normalize and sort list values so ordering doesn't change the key."""
+    return sorted(normalize_text(v) for v in values or [])
+
+
+def make_cache_key(namespace: str, *parts: Any) -> str:
+    """Build a versioned cache key from JSON-serializable parts."""
+    payload = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS, default=str)
+    digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    return f"nutrivision:{CACHE_VERSION}:{namespace}:{digest}"
+
+
+class ResponseCache:
+    """
+    Exact-match response cache.
+    
+    Uses Redis when RESPONSE_CACHE_BACKEND is "redis", so entries are
+    shared across workers, otherwise a bounded in-process TTL cache.
+    Redis errors degrade to the in-process cache rather than failing
+    the request.
+    """
+    
+    def __init__(self):
+        self.ttl = settings.RESPONSE_CACHE_TTL
+        self.max_entries = settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis = None
+        
+        if settings.RESPONSE_CACHE_BACKEND == "redis":
+            try:
+                import redis.asyncio as redis
+                self._redis = redis.from_url(settings.REDIS_URL)
+            except Exception as e:
+                logger.warning(f"Redis cache unavailable, using in-process cache: {e}")
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached response, or None on a miss."""
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+                return orjson.loads(raw) if raw is not None else None
+            except Exception as e:
+                logger.warning(f"Redis cache read failed: {e}")
+        
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        
+        self._local.move_to_end(key)
+        return value
+    
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None):
+        """Store a response for ttl seconds (defaults to RESPONSE_CACHE_TTL)."""
+        ttl = ttl or self.ttl
+        
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, orjson.dumps(value), ex=ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Redis cache write failed: {e}")
+        
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+    
+    async def close(self):
+        """Close the Redis connection if one was opened."""
+        if self._redis is not None:
+            await self._redis.close()
+
+
+class SemanticIndex:
+    """
+    In-process nearest-neighbour index of query embeddings.
+    
+    Maps near-duplicate queries onto the exact-match key of a previously
+    answered query. Entries are partitioned by a context key so answers
+    are only reused for users with the same relevant context.
+    """
+    
+    def __init__(self):
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._partitions: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+    
+    def lookup(self, context_key: str, embedding: List[float]) -> Optional[str]:
+        """Return the cache key of the most similar stored query above threshold."""
+        partition = self._partitions.get(context_key)
+        if partition is None:
+            return None
+        
+        vectors, keys = partition
+        query = self._normalize(embedding)
+        scores = vectors @ query
+        best = int(np.argmax(scores))
+        
+        return keys[best] if scores[best] >= self.threshold else None
+    
+    def add(self, context_key: str, embedding: List[float], cache_key: str):
+        """Index a query embedding under its exact-match cache key."""
+        vector = self._normalize(embedding)[np.newaxis, :]
+        partition = self._partitions.get(context_key)
+        
+        if partition is None:
+            self._partitions[context_key] = (vector, [cache_key])
+            return
+        
+        vectors, keys = partition
+        vectors = np.vstack([vectors, vector])[-self.max_entries:]
+        keys = (keys + [cache_key])[-self.max_entries:]
+        self._partitions[context_key] = (vectors, keys)
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
@@ -0,0 +1,183 @@
+"""
+YOLO Micro-Batching Service
+
+Coalesces concurrent food detection requests into a single
+batched YOLO forward pass.
+"""
+
+import asyncio
+import logging
+from typing import Any, List, Optional, Tuple
+import numpy as np
+import cv2
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Model input stride; tensor inputs must already be a multiple of it
+YOLO_STRIDE = 32
+
+# Letterbox padding value YOLO is trained with (grey, pre-normalization)
+LETTERBOX_FILL = 114 / 255.0
+
+
+class YoloBatcher:
+    """
+    Collects images submitted within a short window and runs them
+    through the food recognition model as one batch.
+    
+    A single background consumer owns all forward passes, so the
+    model is never called from two threads at once. That also makes
+    it safe to reuse one preprocessed input buffer across batches.
+    """
+    
+    def __init__(self, model_loader):
+        self.model_loader = model_loader
+        self.confidence_threshold = settings.FOOD_RECOGNITION_CONFIDENCE
+        self.max_batch = settings.BATCH_MAX_SIZE
+        self.window = settings.BATCH_WINDOW_MS / 1000
+        self.image_size = settings.FOOD_RECOGNITION_IMAGE_SIZE
+        if self.image_size % YOLO_STRIDE:
+            raise ValueError(
+                f"FOOD_RECOGNITION_IMAGE_SIZE must be a multiple of {YOLO_STRIDE}, "
+                f"got {self.image_size}"
+            )
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        
+        # Reusable normalized NCHW float32 model input
+        self._input_buf = np.empty(
+            (self.max_batch, 3, self.image_size, self.image_size),
+            dtype=np.float32
+        )
+    
+    def start(self):
+        """Start the background batching consumer."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"YOLO batcher started (max_batch={self.max_batch}, "
+                f"window={settings.BATCH_WINDOW_MS}ms)"
+            )
+    
+    async def stop(self):
+        """Stop the consumer and fail any requests still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Detection service shutting down"))
+    
+    async def submit(self, image: np.ndarray) -> Any:
+        """
+        Queue an RGB image for detection.
+        
+        Returns:
+            The YOLO result for this image
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+    
+    async def _run(self):
+        """Drain the queue into batches and run them."""
+        while True:
+            items = [await self._queue.get()]
+            
+            # Give concurrent requests a moment to join unless a full batch is waiting
+            if self._queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.window)
+            
+            while len(items) < self.max_batch and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            
+            # Skip requests whose callers have gone away
+            items = [(image, future) for image, future in items if not future.cancelled()]
+            if items:
+                await self._run_batch(items)
+    
+    async def _run_batch(self, items: List[Tuple[np.ndarray, asyncio.Future]]):
+        """Run one batched forward pass and scatter results to callers."""
+        try:
+            food_model = await self.model_loader.get_model('food_recognition')
+            
+            if food_model is None:
+                raise ValueError("Food recognition model not loaded")
+            
+            images = [image for image, _ in items]
+            results = await asyncio.to_thread(self._forward, food_model, images)
+        
+        except Exception as e:
+            logger.error(f"Batched detection error: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+    
+    def _forward(self, food_model, images: List[np.ndarray]) -> List[Any]:
+        """
+        Preprocess a batch into the shared buffer and run the model.
+        
+        Images are letterboxed to the model input size (aspect ratio kept,
+        centered on grey padding) and normalized straight into the buffer,
+        skipping YOLO's own per-call preprocessing. Boxes are mapped back
+        to each image's original dimensions.
+        """
+        import torch
+        
+        size = self.image_size
+        letterboxes = []
+        
+        for i, image in enumerate(images):
+            height, width = image.shape[:2]
+            scale = min(size / height, size / width)
+            new_w = min(size, round(width * scale))
+            new_h = min(size, round(height * scale))
+            left = (size - new_w) // 2
+            top = (size - new_h) // 2
+            letterboxes.append((scale, left, top))
+            
+            resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+            self._input_buf[i].fill(LETTERBOX_FILL)
+            np.divide(
+                resized.transpose(2, 0, 1),
+                255.0,
+                out=self._input_buf[i, :, top:top + new_h, left:left + new_w]
+            )
+        
+        batch = torch.from_numpy(self._input_buf[:len(images)])
+        results = food_model.predict(
+            batch,
+            conf=self.confidence_threshold,
+            imgsz=size,
+            # FP16 inference on CUDA (tensor cores, half the bandwidth)
+            half=self.model_loader.device == "cuda",
+            verbose=False
+        )
+        
+        # Result tensors are inference tensors, so edit them in inference mode
+        with torch.inference_mode():
+            for image, result, (scale, left, top) in zip(images, results, letterboxes):
+                if result.boxes is None or len(result.boxes) == 0:
+                    continue
+                height, width = image.shape[:2]
+                coords = result.boxes.data
+                coords[:, 0:4:2] -= left
+                coords[:, 1:4:2] -= top
+                coords[:, :4] /= scale
+                coords[:, 0:4:2].clamp_(0, width)
+                coords[:, 1:4:2].clamp_(0, height)
+        
+        return results
@@ -0,0 +1,199 @@
+"""
+Response Compression Middleware
+
+Negotiates the response encoding from Accept-Encoding, preferring
+brotli, then zstd, then gzip. Brotli and zstd are used only when their
+packages are installed. Server-Sent Event streams pass through
+uncompressed so every event is sent as soon as it is produced.
+"""
+
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+# Encodings in order of preference, limited to those available
+SUPPORTED_ENCODINGS: List[str] = [
+    encoding for encoding, available in (
+        ("br", brotli is not None),
+        ("zstd", zstandard is not None),
+        ("gzip", True),
+    )
+    if available
+]
+
+# Responses that must not be buffered by a compressor
+UNCOMPRESSED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred supported encoding the client accepts."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        token, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip())
+    
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+class _Compressor:
+    """Incremental compressor with a common interface across encodings."""
+    
+    def __init__(self, encoding: str, brotli_quality: int, zstd_level: int, gzip_level: int):
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=brotli_quality)
+            self._write = self._obj.process
+            self._flush = self._obj.flush
+            self._finish = self._obj.finish
+        elif encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+            self._write = self._obj.compress
+            self._flush = lambda: self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = self._obj.flush
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._write = self._obj.compress
+            self._flush = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._obj.flush
+    
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk and flush it; `final` ends the stream."""
+        out = self._write(data)
+        return out + (self._finish() if final else self._flush())
+
+
+class CompressionMiddleware:
+    """
+    Compress HTTP responses with the best encoding the client accepts.
+    
+    Small single-part responses, responses that already carry a
+    Content-Encoding and event streams are sent unchanged.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        gzip_level: int = 6
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.gzip_level = gzip_level
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._passthrough = False
+        self._compressor: Optional[_Compressor] = None
+    
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        
+        if message_type == "http.response.start":
+            # Hold the headers until the first body chunk decides the encoding
+            self._start = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self._passthrough = (
+                "content-encoding" in headers
+                or content_type.startswith(UNCOMPRESSED_CONTENT_TYPES)
+            )
+            return
+        
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+        
+        if self._passthrough:
+            await self._send_start()
+            await self._send(message)
+            return
+        
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        
+        if self._compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                await self._send_start()
+                await self._send(message)
+                self._passthrough = True
+                return
+            
+            self._compressor = _Compressor(
+                self.encoding,
+                self.middleware.brotli_quality,
+                self.middleware.zstd_level,
+                self.middleware.gzip_level
+            )
+            compressed = self._compressor.compress(body, final=not more_body)
+            
+            headers = MutableHeaders(raw=self._start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(compressed))
+            
+            await self._send_start()
+            await self._send({
+                "type": "http.response.body",
+                "body": compressed,
+                "more_body": more_body
+            })
+            return
+        
+        await self._send({
+            "type": "http.response.body",
+            "body": self._compressor.compress(body, final=not more_body),
+            "more_body": more_body
+        })
+    
+    async def _send_start(self) -> None:
+        if self._start is not None:
+            await self._send(self._start)
+            self._start = None
@@ -8,11 +8,17 @@ for production and human-readable format for development.
 import logging
 import sys
 from typing import Any
+import orjson
 import structlog
 
 from app.config import settings
 
 
+def _orjson_dumps(value: Any, **kwargs) -> str:
+    """JSONRenderer serializer; keeps structlog's fallback for unknown types."""
+    return orjson.dumps(value, default=kwargs.get("default")).decode()
+
+
 def setup_logging():
     """Configure logging for the application."""
     
@@ -23,16 +29,19 @@ def setup_logging():
     shared_processors = [
         structlog.stdlib.add_log_level,
         structlog.stdlib.add_logger_name,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
+        structlog.processors.TimeStamper(fmt="iso", utc=True, key="ts"),
         structlog.processors.UnicodeDecoder(),
     ]
     
+    # Stack rendering is only worth its cost when debugging
+    if log_level <= logging.DEBUG:
+        shared_processors.append(structlog.processors.StackInfoRenderer())
+    
     if settings.LOG_FORMAT == "json":
         # JSON formatting for production
         processors = shared_processors + [
             structlog.processors.format_exc_info,
-            structlog.processors.JSONRenderer()
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps)
         ]
     else:
         # Human-readable format for development
@@ -45,7 +54,8 @@ def setup_logging():
         processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
+        # Calls below the configured level return before any processor runs
+        wrapper_class=structlog.make_filtering_bound_logger(log_level),
         cache_logger_on_first_use=True,
     )
     
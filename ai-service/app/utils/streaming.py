@@ -0,0 +1,28 @@
+"""
+Streaming Response Helpers
+
+Server-Sent Events formatting shared by the streaming endpoints.
+"""
+
+import logging
+import orjson
+from typing import Any, AsyncIterator, Dict
+
+logger = logging.getLogger(__name__)
+
+
+# Streaming headers; disable proxy buffering so events arrive immediately
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+async def sse_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Format service events as Server-Sent Events."""
+    try:
+        async for event in events:
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+    except Exception as e:
+        logger.error(f"Streaming error: {e}")
+        yield b"data: " + orjson.dumps({'type': 'error', 'detail': str(e)}) + b"\n\n"
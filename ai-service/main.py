@@ -9,24 +9,40 @@ This microservice handles:
 """
 
 import os
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Optional
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 from app.config import settings
 from app.routers import food_analysis, chat, plans, health
 from app.services.model_loader import ModelLoader
+from app.services.food_detection import FoodDetectionService
+from app.services.yolo_batcher import YoloBatcher
+from app.services.genai_service import GenAIService, create_openai_client
+from app.services.openai_dispatcher import OpenAIDispatcher
+from app.services.response_cache import ResponseCache
+from app.utils.compression import CompressionMiddleware
 from app.utils.logger import setup_logging
 
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Under `gunicorn --preload` this module is imported once in the master
+# before workers fork, so CPU weights loaded here are shared copy-on-write
+# (see ModelLoader.preload_models for what each backend shares)
+preloaded_model_loader: Optional[ModelLoader] = None
+if settings.PRELOAD_MODELS:
+    preloaded_model_loader = ModelLoader()
+    preloaded_model_loader.preload_models()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -37,16 +53,47 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting NutriVision AI Service...")
     
-    # Load ML models
+    # Size the default executor used for model inference
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=settings.INFERENCE_WORKERS)
+    )
+    
+    # Set up ML models (preloaded before fork, or loaded on first use and
+    # optionally prewarmed)
     try:
-        model_loader = ModelLoader()
-        await model_loader.load_models()
+        model_loader = preloaded_model_loader or ModelLoader()
+        model_loader.warm_models(
+            name.strip() for name in settings.WARM_MODELS.split(",") if name.strip()
+        )
         app.state.model_loader = model_loader
-        logger.info("✅ ML models loaded successfully")
+        
+        # Coalesce concurrent detections into batched forward passes
+        batcher = YoloBatcher(model_loader)
+        batcher.start()
+        app.state.batcher = batcher
+        
+        app.state.detection_service = FoodDetectionService(model_loader, batcher)
+        logger.info("✅ ML services initialized")
     except Exception as e:
-        logger.error(f"❌ Failed to load ML models: {e}")
+        logger.error(f"❌ Failed to initialize ML services: {e}")
         raise
     
+    # GenAI client shared by the chat and plan routers
+    if settings.RESPONSE_CACHE_ENABLED:
+        app.state.response_cache = ResponseCache()
+    
+    if settings.OPENAI_DISPATCHER_ENABLED:
+        dispatcher = OpenAIDispatcher()
+        dispatcher.start()
+        app.state.openai_dispatcher = dispatcher
+    
+    app.state.openai_client = create_openai_client()
+    app.state.genai_service = GenAIService(
+        client=app.state.openai_client,
+        cache=getattr(app.state, 'response_cache', None),
+        dispatcher=getattr(app.state, 'openai_dispatcher', None)
+    )
+    
     logger.info(f"✅ NutriVision AI Service started on port {settings.PORT}")
     
     yield
@@ -55,9 +102,21 @@ async def lifespan(app: FastAPI):
     logger.info("👋 Shutting down NutriVision AI Service...")
     
     # Cleanup
+    if hasattr(app.state, 'batcher'):
+        await app.state.batcher.stop()
+    
     if hasattr(app.state, 'model_loader'):
         await app.state.model_loader.unload_models()
     
+    if hasattr(app.state, 'openai_dispatcher'):
+        await app.state.openai_dispatcher.stop()
+    
+    if hasattr(app.state, 'response_cache'):
+        await app.state.response_cache.close()
+    
+    if hasattr(app.state, 'openai_client'):
+        await app.state.openai_client.close()
+    
     logger.info("✅ Cleanup complete")
 
 
@@ -84,7 +143,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # ===========================================
@@ -100,8 +160,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# GZip compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Response compression (brotli, zstd or gzip, by Accept-Encoding)
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
 
 # ===========================================
 # Route Registration
@@ -158,5 +218,9 @@ if __name__ == "__main__":
         port=settings.PORT,
         reload=settings.DEBUG,
         workers=settings.WORKERS if not settings.DEBUG else 1,
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=75,
+        backlog=2048,
         log_level="debug" if settings.DEBUG else "info"
     )
@@ -0,0 +1,39 @@
+"""
+Tests for food detection helpers.
+"""
+
+import warnings
+
+import numpy as np
+
+from app.services.food_detection import bbox_depth_region
+
+
+def test_bbox_depth_region_tiny_box_is_not_empty():
+    """A box smaller than one depth-map pixel still yields a depth sample."""
+    depth_map = np.arange(16, dtype=np.float32).reshape(4, 4)
+    
+    region = bbox_depth_region(depth_map, (400, 400), (10, 10, 12, 12))
+    
+    assert region.shape == (1, 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert not np.isnan(np.mean(region))
+
+
+def test_bbox_depth_region_edge_box_stays_inside_map():
+    """A box on the far image edge maps to the last depth-map pixels."""
+    depth_map = np.ones((4, 4), dtype=np.float32)
+    
+    region = bbox_depth_region(depth_map, (400, 400), (399, 399, 400, 400))
+    
+    assert region.size == 1
+
+
+def test_bbox_depth_region_scales_to_depth_resolution():
+    """Boxes are scaled from image to depth-map coordinates."""
+    depth_map = np.zeros((4, 8), dtype=np.float32)
+    
+    region = bbox_depth_region(depth_map, (100, 200), (50, 25, 150, 75))
+    
+    assert region.shape == (2, 4)